@@ -1,9 +1,17 @@
+import json
+
 from adminsortable2.admin import SortableAdminMixin
 from cms.admin.placeholderadmin import PlaceholderAdminMixin
 from django.contrib import admin, auth
 from django.contrib.auth.models import Group
+from django.core.exceptions import PermissionDenied
+from django.core.paginator import Paginator
+from django.db import connection
+from django.http import Http404, HttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import path, reverse, reverse_lazy
+from django.utils.dateparse import parse_datetime
+from django.utils.html import format_html
 from django.utils.translation import gettext_lazy as _
 from froide.follow.admin import FollowerAdmin
 from froide.helper.admin_utils import make_choose_object_action, make_emptyfilter
@@ -11,23 +19,77 @@ from froide.helper.widgets import TagAutocompleteWidget
 from froide.organization.models import Organization
 
 from . import conf
-from .auth import get_allowed_plans, has_limited_access
+from .admin_utils import EstimatedCountMixin, SearchFilter
+from .auth import get_allowed_plans, get_permission_context
+from .bulk import get_job_progress, start_bulk_job
 from .forms import (
+    GovernmentPlanBulkUpdateForm,
     GovernmentPlanForm,
     GovernmentPlanUpdateAcceptProposalForm,
     GovernmentPlanUpdateForm,
 )
 from .models import (
+    CategorizedGovernmentPlan,
     Government,
     GovernmentPlan,
     GovernmentPlanFollower,
     GovernmentPlanSection,
     GovernmentPlanUpdate,
+    PlanStatus,
+    RequestProfile,
 )
 
 User = auth.get_user_model()
 
 
+PROPOSAL_ROWS_SQL = (
+    "SELECT {columns} FROM froide_govplan_governmentplan AS plan "
+    "CROSS JOIN LATERAL jsonb_each(plan.proposals) AS proposal(user_id, value) "
+    "WHERE plan.proposals IS NOT NULL AND plan.id IN ({plans})"
+)
+
+
+def autofills_organization(request):
+    """
+    Updates added by limited users get the organization of their plan
+    if the user belongs to the organization with pk 1.
+    """
+    if not get_permission_context(request).limited_access:
+        return False
+    return request.user.organization_set.all().filter(pk=1).exists()
+
+
+class ProposalRows:
+    """
+    Pending proposals of the given plans with one row per proposal,
+    newest first. Supports count and slicing for the paginator.
+    """
+
+    def __init__(self, plans):
+        self.plans_sql, self.plans_params = plans.values("id").query.sql_with_params()
+
+    def get_sql(self, columns):
+        return PROPOSAL_ROWS_SQL.format(columns=columns, plans=self.plans_sql)
+
+    def count(self):
+        with connection.cursor() as cursor:
+            cursor.execute(self.get_sql("count(*)"), self.plans_params)
+            return cursor.fetchone()[0]
+
+    def __getitem__(self, index):
+        sql = self.get_sql("plan.id, proposal.user_id, proposal.value::text") + (
+            " ORDER BY (proposal.value->>'timestamp')::timestamptz DESC,"
+            " plan.id, proposal.user_id LIMIT %s OFFSET %s"
+        )
+        params = tuple(self.plans_params) + (index.stop - index.start, index.start)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return [
+                (plan_id, user_id, json.loads(value))
+                for plan_id, user_id, value in cursor.fetchall()
+            ]
+
+
 class GovPlanAdminSite(admin.AdminSite):
     site_header = conf.GOVPLAN_NAME
     site_url = None
@@ -36,7 +98,7 @@ class GovPlanAdminSite(admin.AdminSite):
 class GovernmentPlanAdminForm(GovernmentPlanForm):
     class Meta:
         model = GovernmentPlan
-        fields = "__all__"
+        exclude = ("proposals",)
         widgets = {
             "categories": TagAutocompleteWidget(
                 autocomplete_url=reverse_lazy("api:category-autocomplete")
@@ -51,12 +113,38 @@ class GovernmentAdmin(admin.ModelAdmin):
     raw_id_fields = ("georegion",)
 
 
+class CategorySearchFilter(SearchFilter):
+    title = _("category")
+    parameter_name = "category"
+
+    def queryset(self, request, queryset):
+        if not self.value():
+            return queryset
+        return queryset.filter(
+            id__in=CategorizedGovernmentPlan.objects.filter(
+                tag__name__icontains=self.value()
+            ).values("content_object_id")
+        )
+
+
+class OrganizationSearchFilter(SearchFilter):
+    title = _("organization")
+    parameter_name = "organization_name"
+
+    def queryset(self, request, queryset):
+        if not self.value():
+            return queryset
+        return queryset.filter(organization__name__icontains=self.value())
+
+
 def execute_assign_organization(admin, request, queryset, action_obj):
-    queryset.update(organization=action_obj)
+    admin.run_bulk_job(
+        request, "assign_organization", queryset, organization_id=action_obj.id
+    )
 
 
 def execute_assign_group(admin, request, queryset, action_obj):
-    queryset.update(group=action_obj)
+    admin.run_bulk_job(request, "assign_group", queryset, group_id=action_obj.id)
 
 
 PLAN_ACTIONS = {
@@ -69,7 +157,7 @@ PLAN_ACTIONS = {
 }
 
 
-class GovernmentPlanAdmin(admin.ModelAdmin):
+class GovernmentPlanAdmin(EstimatedCountMixin, admin.ModelAdmin):
     form = GovernmentPlanForm
 
     save_on_top = True
@@ -77,20 +165,16 @@ class GovernmentPlanAdmin(admin.ModelAdmin):
     search_fields = ("title",)
     raw_id_fields = ("responsible_publicbody",)
 
-    actions = ["make_public"]
+    actions = ["make_public", "create_updates"]
 
     def get_queryset(self, request):
         qs = get_allowed_plans(request)
-        qs = qs.prefetch_related(
-            "categories",
-            "organization",
-            "group",
-        )
+        qs = qs.select_related("organization", "group").prefetch_related("categories")
         return qs
 
     def get_actions(self, request):
         actions = super().get_actions(request)
-        if not has_limited_access(request.user):
+        if not get_permission_context(request).limited_access:
             admin_actions = {
                 action: (
                     func,
@@ -110,6 +194,16 @@ class GovernmentPlanAdmin(admin.ModelAdmin):
                 self.admin_site.admin_view(self.accept_proposal),
                 name="froide_govplan-plan_accept_proposal",
             ),
+            path(
+                "bulk-job/<str:job_id>/",
+                self.admin_site.admin_view(self.bulk_job_progress),
+                name="froide_govplan-plan_bulk_job",
+            ),
+            path(
+                "proposals/",
+                self.admin_site.admin_view(self.proposal_queue),
+                name="froide_govplan-plan_proposal_queue",
+            ),
         ]
         return my_urls + urls
 
@@ -122,7 +216,7 @@ class GovernmentPlanAdmin(admin.ModelAdmin):
             "organization",
             "get_categories",
         ]
-        if not has_limited_access(request.user):
+        if not get_permission_context(request).limited_access:
             list_display.append("group")
         return list_display
 
@@ -132,22 +226,22 @@ class GovernmentPlanAdmin(admin.ModelAdmin):
             "rating",
             "public",
         ]
-        if not has_limited_access(request.user):
+        if not get_permission_context(request).limited_access:
             list_filter.extend(
                 [
                     make_emptyfilter(
                         "proposals", _("Has change proposals"), empty_value=None
                     ),
-                    "organization",
+                    OrganizationSearchFilter,
                     "group",
                     "government",
-                    "categories",
+                    CategorySearchFilter,
                 ]
             )
         return list_filter
 
     def get_fields(self, request, obj=None):
-        if has_limited_access(request.user):
+        if get_permission_context(request).limited_access:
             return (
                 "title",
                 "slug",
@@ -172,10 +266,142 @@ class GovernmentPlanAdmin(admin.ModelAdmin):
     get_categories.short_description = _("category(s)")
 
     def make_public(self, request, queryset):
-        queryset.update(public=True)
+        self.run_bulk_job(request, "make_public", queryset)
 
     make_public.short_description = _("Make public")
 
+    def create_updates(self, request, queryset):
+        if request.POST.get("post"):
+            form = GovernmentPlanBulkUpdateForm(data=request.POST)
+            if form.is_valid():
+                updates = form.save(
+                    queryset,
+                    user=request.user,
+                    autofill_organization=autofills_organization(request),
+                )
+                self.message_user(
+                    request,
+                    _("%s updates have been created.") % len(updates),
+                )
+                return None
+        else:
+            form = GovernmentPlanBulkUpdateForm()
+
+        request.current_app = self.admin_site.name
+        opts = self.model._meta
+        context = {
+            **self.admin_site.each_context(request),
+            "title": _("Create updates"),
+            "form": form,
+            "media": self.media + form.media,
+            "queryset": queryset,
+            "action_checkbox_name": admin.helpers.ACTION_CHECKBOX_NAME,
+            "app_label": opts.app_label,
+            "opts": opts,
+        }
+        return render(
+            request,
+            "froide_govplan/admin/bulk_update.html",
+            context,
+        )
+
+    create_updates.short_description = _("Create update for selected plans...")
+    create_updates.allowed_permissions = ("create_updates",)
+
+    def has_create_updates_permission(self, request):
+        opts = GovernmentPlanUpdate._meta
+        codename = auth.get_permission_codename("add", opts)
+        return request.user.has_perm("{}.{}".format(opts.app_label, codename))
+
+    def run_bulk_job(self, request, action, queryset, **kwargs):
+        job_id = start_bulk_job(action, queryset, **kwargs)
+        url = reverse(
+            "admin:froide_govplan-plan_bulk_job",
+            args=(job_id,),
+            current_app=self.admin_site.name,
+        )
+        self.message_user(
+            request,
+            format_html(
+                '{} <a href="{}">{}</a>',
+                _("The action is running in the background."),
+                url,
+                _("Show progress"),
+            ),
+        )
+
+    def bulk_job_progress(self, request, job_id):
+        progress = get_job_progress(job_id)
+        if progress is None:
+            raise Http404
+
+        request.current_app = self.admin_site.name
+        opts = self.model._meta
+        context = {
+            **self.admin_site.each_context(request),
+            "title": _("Bulk action progress"),
+            "progress": progress,
+            "percentage": (
+                100
+                if not progress["total"]
+                else int(progress["done"] / progress["total"] * 100)
+            ),
+            "app_label": opts.app_label,
+            "opts": opts,
+        }
+        return render(
+            request,
+            "froide_govplan/admin/bulk_job.html",
+            context,
+        )
+
+    def proposal_queue(self, request):
+        # Proposals are paginated in the database, newest first,
+        # and only the plans of proposals on the page are loaded
+        paginator = Paginator(ProposalRows(get_allowed_plans(request)), 50)
+        page = paginator.get_page(request.GET.get("page"))
+        plans = GovernmentPlan.objects.filter(
+            id__in={plan_id for plan_id, _user_id, _proposal in page}
+        ).select_related("government")
+        plan_map = {
+            plan.id: plan for plan in plans.only("id", "title", "government__name")
+        }
+
+        status_dict = dict(PlanStatus.choices)
+        entries = [
+            {
+                "plan": plan_map[plan_id],
+                "user_id": user_id,
+                "timestamp": parse_datetime(proposal["timestamp"]),
+                "data": proposal["data"],
+                "status_label": status_dict.get(proposal["data"]["status"]),
+            }
+            for plan_id, user_id, proposal in page
+        ]
+
+        users = User.objects.filter(
+            id__in=[e["user_id"] for e in entries]
+        ).prefetch_related("organization_set")
+        user_map = {str(u.id): u for u in users}
+        for entry in entries:
+            entry["user"] = user_map.get(entry["user_id"])
+
+        request.current_app = self.admin_site.name
+        opts = self.model._meta
+        context = {
+            **self.admin_site.each_context(request),
+            "title": _("Pending proposals"),
+            "page": page,
+            "entries": entries,
+            "app_label": opts.app_label,
+            "opts": opts,
+        }
+        return render(
+            request,
+            "froide_govplan/admin/proposal_queue.html",
+            context,
+        )
+
     def accept_proposal(self, request, pk):
         obj = get_object_or_404(self.get_queryset(request), pk=pk)
         plan_url = reverse(
@@ -235,12 +461,13 @@ class GovernmentPlanAdmin(admin.ModelAdmin):
         )
 
 
-class GovernmentPlanUpdateAdmin(admin.ModelAdmin):
+class GovernmentPlanUpdateAdmin(EstimatedCountMixin, admin.ModelAdmin):
     form = GovernmentPlanUpdateForm
     save_on_top = True
     raw_id_fields = ["user"] + (
         ["foirequest"] if conf.GOVPLAN_ENABLE_FOIREQUEST else []
     )
+    autocomplete_fields = ["plan"]
     date_hierarchy = "timestamp"
     search_fields = ("title", "content")
     list_display = (
@@ -255,7 +482,7 @@ class GovernmentPlanUpdateAdmin(admin.ModelAdmin):
     list_filter = (
         "status",
         "public",
-        "organization",
+        OrganizationSearchFilter,
     )
     search_fields = (
         "title",
@@ -265,24 +492,22 @@ class GovernmentPlanUpdateAdmin(admin.ModelAdmin):
 
     def get_queryset(self, request):
         qs = super().get_queryset(request)
-        qs = qs.prefetch_related(
+        qs = qs.select_related(
             "plan",
             "user",
         )
-        if has_limited_access(request.user):
+        if get_permission_context(request).limited_access:
             qs = qs.filter(plan__in=get_allowed_plans(request))
         return qs
 
     def save_model(self, request, obj, form, change):
-        limited = has_limited_access(request.user)
+        limited = get_permission_context(request).limited_access
         if not change and limited:
             # When added by a limited user,
             # autofill user and organization
             obj.user = request.user
-            if obj.plan.organization:
-                user_has_org = request.user.organization_set.all().filter(pk=1).exists()
-                if user_has_org:
-                    obj.organization = obj.plan.organization
+            if obj.plan.organization and autofills_organization(request):
+                obj.organization = obj.plan.organization
 
         res = super().save_model(request, obj, form, change)
 
@@ -290,8 +515,21 @@ class GovernmentPlanUpdateAdmin(admin.ModelAdmin):
 
         return res
 
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        GovernmentPlan.objects.update_from_updates(
+            qs=GovernmentPlan.objects.filter(id=obj.plan_id)
+        )
+
+    def delete_queryset(self, request, queryset):
+        plan_ids = set(queryset.values_list("plan_id", flat=True))
+        super().delete_queryset(request, queryset)
+        GovernmentPlan.objects.update_from_updates(
+            qs=GovernmentPlan.objects.filter(id__in=plan_ids)
+        )
+
     def get_fields(self, request, obj=None):
-        if has_limited_access(request.user):
+        if get_permission_context(request).limited_access:
             return (
                 "plan",
                 "title",
@@ -306,15 +544,12 @@ class GovernmentPlanUpdateAdmin(admin.ModelAdmin):
 
     def formfield_for_foreignkey(self, db_field, request, **kwargs):
         if db_field.name == "plan":
-            if has_limited_access(request.user):
+            if get_permission_context(request).limited_access:
                 kwargs["queryset"] = get_allowed_plans(request)
         return super().formfield_for_foreignkey(db_field, request, **kwargs)
 
     def user_in_obj_group(self, request, obj):
-        if not obj.plan.group_id:
-            return False
-        user = request.user
-        return User.objects.filter(pk=user.pk, groups=obj.plan.group_id).exists()
+        return get_permission_context(request).in_group(obj.plan.group_id)
 
     def has_view_permission(self, request, obj=None):
         if obj and self.user_in_obj_group(request, obj):
@@ -348,11 +583,86 @@ class GovernmentPlanSectionAdmin(
     )
 
 
+class RequestProfileAdmin(admin.ModelAdmin):
+    date_hierarchy = "timestamp"
+    list_display = (
+        "timestamp",
+        "endpoint",
+        "path",
+        "duration",
+        "query_count",
+        "db_time",
+        "user",
+        "download_link",
+    )
+    list_filter = ("endpoint",)
+    search_fields = ("path",)
+    raw_id_fields = ("user",)
+    exclude = ("stats",)
+    readonly_fields = (
+        "timestamp",
+        "user",
+        "endpoint",
+        "path",
+        "duration",
+        "query_count",
+        "db_time",
+        "download_link",
+        "summary",
+        "queries",
+    )
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).defer("stats", "queries", "summary")
+
+    def get_urls(self):
+        urls = super().get_urls()
+        my_urls = [
+            path(
+                "<int:pk>/download/",
+                self.admin_site.admin_view(self.download),
+                name="froide_govplan-requestprofile_download",
+            ),
+        ]
+        return my_urls + urls
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def download_link(self, obj):
+        return format_html(
+            '<a href="{}">{}</a>',
+            reverse(
+                "admin:froide_govplan-requestprofile_download",
+                args=(obj.pk,),
+                current_app=self.admin_site.name,
+            ),
+            _("Download"),
+        )
+
+    download_link.short_description = _("profile")
+
+    def download(self, request, pk):
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        profile = get_object_or_404(RequestProfile, pk=pk)
+        response = HttpResponse(
+            bytes(profile.stats), content_type="application/octet-stream"
+        )
+        filename = "govplan-{}.prof".format(profile.pk)
+        response["Content-Disposition"] = 'attachment; filename="{}"'.format(filename)
+        return response
+
+
 admin.site.register(Government, GovernmentAdmin)
 admin.site.register(GovernmentPlan, GovernmentPlanAdmin)
 admin.site.register(GovernmentPlanUpdate, GovernmentPlanUpdateAdmin)
 admin.site.register(GovernmentPlanSection, GovernmentPlanSectionAdmin)
 admin.site.register(GovernmentPlanFollower, FollowerAdmin)
+admin.site.register(RequestProfile, RequestProfileAdmin)
 
 govplan_admin_site = GovPlanAdminSite(name="govplanadmin")
 govplan_admin_site.register(GovernmentPlan, GovernmentPlanAdmin)
@@ -0,0 +1,68 @@
+import json
+
+from django.contrib import admin
+from django.contrib.admin.views.main import PAGE_VAR
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import QuerySet
+from django.utils.functional import cached_property
+
+from . import conf
+
+
+def get_estimated_count(queryset):
+    """
+    Returns the row estimate of the query planner for queryset.
+    """
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute("EXPLAIN (FORMAT JSON) {}".format(sql), params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]["Plan"]["Plan Rows"]
+
+
+class EstimatedCountPaginator(Paginator):
+    @cached_property
+    def count(self):
+        threshold = conf.GOVPLAN_ADMIN_COUNT_ESTIMATE_THRESHOLD
+        if threshold is not None and isinstance(self.object_list, QuerySet):
+            estimate = get_estimated_count(self.object_list)
+            if estimate > threshold:
+                return estimate
+        return super().count
+
+
+class EstimatedCountMixin:
+    """
+    Changelist mode that avoids exact counts on large tables.
+    """
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = conf.GOVPLAN_ADMIN_COUNT_ESTIMATE_THRESHOLD is None
+
+
+class SearchFilter(admin.SimpleListFilter):
+    """
+    List filter with a search input instead of a list of all choices.
+    """
+
+    template = "froide_govplan/admin/search_filter.html"
+
+    def lookups(self, request, model_admin):
+        return ()
+
+    def has_output(self):
+        return True
+
+    def choices(self, changelist):
+        yield {
+            "parameter_name": self.parameter_name,
+            "value": self.value() or "",
+            "query_parts": [
+                (key, value)
+                for key, value in changelist.params.items()
+                if key not in (self.parameter_name, PAGE_VAR)
+            ],
+        }
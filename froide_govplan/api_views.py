@@ -1,7 +1,11 @@
+from django.utils.decorators import method_decorator
+
 from django_filters import rest_framework as filters
 from rest_framework import serializers, viewsets
 
+from .metrics import instrument
 from .models import Government, GovernmentPlan, GovernmentPlanUpdate
+from .profiling import profile_request
 
 
 class GovernmentSerializer(serializers.ModelSerializer):
@@ -78,6 +82,8 @@ class GovernmentPlanFilter(filters.FilterSet):
         return queryset.filter(**{"properties__%s__contains" % key: value})
 
 
+@method_decorator(profile_request("api_plans"), name="dispatch")
+@method_decorator(instrument("api_plans"), name="dispatch")
 class GovernmentPlanViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = GovernmentPlanSerializer
     filterset_class = GovernmentPlanFilter
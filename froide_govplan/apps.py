@@ -11,9 +11,13 @@ class FroideGovPlanConfig(AppConfig):
         from froide.follow.configuration import follow_registry
 
         from .api_views import GovernmentPlanViewSet
+        from .cache import connect_cache_invalidation
         from .configuration import GovernmentPlanFollowConfiguration
+        from .thumbnails import connect_thumbnail_generation
 
         follow_registry.register(GovernmentPlanFollowConfiguration())
+        connect_cache_invalidation()
+        connect_thumbnail_generation()
 
         api_router.register(
             r"governmentplan", GovernmentPlanViewSet, basename="governmentplan"
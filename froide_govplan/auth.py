@@ -1,4 +1,5 @@
 from django.db.models import Q
+from django.utils.functional import cached_property
 
 from .models import GovernmentPlan
 
@@ -9,19 +10,50 @@ def has_limited_access(user):
     return not user.has_perm("froide_govplan.add_governmentplan")
 
 
+class PermissionContext:
+    """
+    Permission flags and group memberships of a user,
+    loaded once per request.
+    """
+
+    def __init__(self, user):
+        self.user = user
+
+    @cached_property
+    def limited_access(self):
+        return has_limited_access(self.user)
+
+    @cached_property
+    def group_ids(self):
+        if not self.user.is_authenticated:
+            return frozenset()
+        return frozenset(self.user.groups.values_list("id", flat=True))
+
+    def in_group(self, group_id):
+        return group_id is not None and group_id in self.group_ids
+
+
+def get_permission_context(request):
+    context = getattr(request, "_govplan_permissions", None)
+    if context is None or context.user is not request.user:
+        context = PermissionContext(request.user)
+        request._govplan_permissions = context
+    return context
+
+
 def get_allowed_plans(request):
-    if not has_limited_access(request.user):
+    context = get_permission_context(request)
+    if not context.limited_access:
         return GovernmentPlan.objects.all()
-    groups = request.user.groups.all()
-    return GovernmentPlan.objects.filter(group__in=groups).distinct()
+    return GovernmentPlan.objects.filter(group_id__in=context.group_ids)
 
 
 def get_visible_plans(request):
-    if not has_limited_access(request.user):
+    context = get_permission_context(request)
+    if not context.limited_access:
         return GovernmentPlan.objects.all()
     if request.user.is_authenticated:
-        groups = request.user.groups.all()
         return GovernmentPlan.objects.filter(
-            Q(public=True) | Q(group__in=groups)
-        ).distinct()
+            Q(public=True) | Q(group_id__in=context.group_ids)
+        )
     return GovernmentPlan.objects.filter(public=True)
@@ -0,0 +1,94 @@
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from . import conf
+from .models import GovernmentPlan
+from .signals import government_plans_changed
+
+BULK_ACTIONS = {}
+
+JOB_TIMEOUT = 60 * 60 * 24
+
+
+def register_bulk_action(name):
+    def decorator(func):
+        BULK_ACTIONS[name] = func
+        return func
+
+    return decorator
+
+
+@register_bulk_action("make_public")
+def make_public(queryset):
+    queryset.update(public=True, updated=timezone.now())
+
+
+@register_bulk_action("assign_organization")
+def assign_organization(queryset, organization_id=None):
+    queryset.update(organization_id=organization_id, updated=timezone.now())
+
+
+@register_bulk_action("assign_group")
+def assign_group(queryset, group_id=None):
+    queryset.update(group_id=group_id, updated=timezone.now())
+
+
+def get_job_cache_key(job_id):
+    return "govplan:bulkjob:{}".format(job_id)
+
+
+def get_job_progress(job_id):
+    return cache.get(get_job_cache_key(job_id))
+
+
+def set_job_progress(job_id, progress):
+    cache.set(get_job_cache_key(job_id), progress, JOB_TIMEOUT)
+
+
+def start_bulk_job(action, queryset, **kwargs):
+    """
+    Runs a registered bulk action on the plans of queryset in the background.
+    Returns the job id to query its progress.
+    """
+    from .tasks import run_bulk_job
+
+    if action not in BULK_ACTIONS:
+        raise ValueError("Unknown bulk action {}".format(action))
+
+    plan_ids = list(queryset.order_by().values_list("id", flat=True))
+    job_id = uuid.uuid4().hex
+    set_job_progress(
+        job_id,
+        {"action": action, "total": len(plan_ids), "done": 0, "finished": False},
+    )
+    transaction.on_commit(lambda: run_bulk_job.delay(job_id, action, plan_ids, kwargs))
+    return job_id
+
+
+def execute_bulk_job(job_id, action, plan_ids, kwargs):
+    func = BULK_ACTIONS[action]
+    chunk_size = conf.GOVPLAN_BULK_CHUNK_SIZE
+    government_ids = set()
+    progress = get_job_progress(job_id) or {"action": action, "total": len(plan_ids)}
+
+    for offset in range(0, len(plan_ids), chunk_size):
+        chunk = plan_ids[offset : offset + chunk_size]
+        with transaction.atomic():
+            queryset = GovernmentPlan.objects.filter(id__in=chunk)
+            government_ids.update(
+                queryset.order_by().values_list("government_id", flat=True).distinct()
+            )
+            func(queryset, **kwargs)
+        progress.update({"done": offset + len(chunk), "finished": False})
+        set_job_progress(job_id, progress)
+
+    for government_id in government_ids:
+        government_plans_changed.send(
+            sender=GovernmentPlan, government_id=government_id
+        )
+
+    progress.update({"done": len(plan_ids), "finished": True})
+    set_job_progress(job_id, progress)
@@ -0,0 +1,237 @@
+import hashlib
+import threading
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.http import urlencode
+from django.utils.translation import get_language
+
+from . import conf
+from .metrics import record_cache_access
+from .models import (
+    Government,
+    GovernmentPlan,
+    GovernmentPlanSection,
+    GovernmentPlanUpdate,
+)
+from .signals import cache_tags_purged, government_plans_changed
+
+_local = threading.local()
+
+
+def get_version_key(government_id=None):
+    return "govplan:version:{}".format(government_id or "all")
+
+
+def get_cache_version(government_id=None):
+    """
+    Returns the cache version of a government or of all governments.
+    The version changes whenever plans, updates or sections change.
+    """
+    key = get_version_key(government_id)
+    version = cache.get(key)
+    if version is None:
+        # Start from the current time so versions never repeat
+        # after a version key was evicted
+        version = int(time.time())
+        if not cache.add(key, version, None):
+            version = cache.get(key, version)
+    return version
+
+
+def bump_cache_version(government_id=None):
+    bump_cache_versions([government_id])
+
+
+def bump_cache_versions(government_ids):
+    """
+    Bumps the version of all governments once and the version
+    of each of the given governments.
+    """
+    keys = [get_version_key()] + [
+        get_version_key(government_id)
+        for government_id in set(government_ids)
+        if government_id is not None
+    ]
+    for key in keys:
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, int(time.time()), None)
+
+
+def make_cache_key(prefix, *parts, government_id=None):
+    version = get_cache_version(government_id)
+    return ":".join(
+        ["govplan", prefix, str(government_id or "all"), str(version)]
+        + [str(p) for p in parts]
+    )
+
+
+def get_or_set_cached(key, func, timeout=None):
+    data = cache.get(key)
+    record_cache_access(data is not None)
+    if data is None:
+        data = func()
+        cache.set(key, data, timeout)
+    return data
+
+
+def get_tag_key(tag):
+    return "govplan:tag:{}".format(tag)
+
+
+def get_tag_versions(tags):
+    keys = {get_tag_key(tag): tag for tag in tags}
+    versions = cache.get_many(keys.keys())
+    missing = {key: int(time.time()) for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, None)
+        versions.update(missing)
+    return {keys[key]: version for key, version in versions.items()}
+
+
+def purge_cache_tags(tags):
+    """
+    Invalidates all cached pages that depend on any of tags.
+    """
+    tags = [tag for tag in tags if tag]
+    for tag in tags:
+        try:
+            cache.incr(get_tag_key(tag))
+        except ValueError:
+            cache.set(get_tag_key(tag), int(time.time()), None)
+    if tags:
+        cache_tags_purged.send(sender=None, tags=tags)
+
+
+def get_page_cache_key(request):
+    """
+    Builds the key from the path, the query parameters that change
+    the page and the language. Other parameters like tracking
+    parameters share the cached page.
+    """
+    params = sorted(
+        (name, value)
+        for name, values in request.GET.lists()
+        if name in conf.GOVPLAN_PAGE_CACHE_PARAMS
+        for value in values
+    )
+    key = "{}?{}".format(request.path, urlencode(params))
+    key_hash = hashlib.md5(key.encode("utf-8")).hexdigest()
+    return "govplan:page:{}:{}".format(get_language(), key_hash)
+
+
+def get_cached_page(request):
+    entry = cache.get(get_page_cache_key(request))
+    if entry is None or get_tag_versions(entry["tags"]) != entry["tags"]:
+        record_cache_access(False)
+        return None
+    record_cache_access(True)
+    response = HttpResponse(
+        entry["content"], content_type=entry["content_type"], status=entry["status"]
+    )
+    add_surrogate_keys(response, entry["tags"])
+    return response
+
+
+def set_cached_page(request, response, tag_versions):
+    entry = {
+        "tags": tag_versions,
+        "content": response.content,
+        "content_type": response["Content-Type"],
+        "status": response.status_code,
+    }
+    cache.set(get_page_cache_key(request), entry, conf.GOVPLAN_PAGE_CACHE_TIMEOUT)
+
+
+def add_surrogate_keys(response, tags):
+    if conf.GOVPLAN_PAGE_CACHE_SURROGATE_KEYS:
+        response["Surrogate-Key"] = " ".join(
+            "govplan-{}".format(tag.replace(":", "-")) for tag in tags
+        )
+
+
+class PendingInvalidation:
+    """
+    Collects the governments and tags changed in a transaction
+    so that each of them is invalidated only once on commit.
+    """
+
+    def __init__(self):
+        self.government_ids = set()
+        self.tags = set()
+
+    def add(self, government_id, tags):
+        self.government_ids.add(government_id)
+        self.tags.update(tags)
+
+    def __call__(self):
+        if getattr(_local, "pending", None) is self:
+            _local.pending = None
+        bump_cache_versions(self.government_ids)
+        purge_cache_tags(sorted(self.tags))
+
+    def is_registered(self, connection):
+        # Rolled back transactions drop their on_commit callbacks
+        return any(entry[1] is self for entry in connection.run_on_commit)
+
+
+def invalidate_government(government_id, tags=()):
+    connection = transaction.get_connection()
+    if not connection.in_atomic_block:
+        bump_cache_version(government_id)
+        purge_cache_tags(tags)
+        return
+
+    pending = getattr(_local, "pending", None)
+    if pending is None or not pending.is_registered(connection):
+        pending = _local.pending = PendingInvalidation()
+        transaction.on_commit(pending)
+    pending.add(government_id, tags)
+
+
+def government_changed(sender, instance, **kwargs):
+    invalidate_government(instance.id, ["government:{}".format(instance.id)])
+
+
+def plan_changed(sender, instance, **kwargs):
+    invalidate_government(
+        instance.government_id,
+        ["plan:{}".format(instance.id), "plans:{}".format(instance.government_id)],
+    )
+
+
+def plan_update_changed(sender, instance, **kwargs):
+    try:
+        government_id = instance.plan.government_id
+    except GovernmentPlan.DoesNotExist:
+        government_id = None
+    # Plan pages show their updates
+    GovernmentPlan.objects.filter(id=instance.plan_id).update(updated=timezone.now())
+    invalidate_government(government_id, ["plan:{}".format(instance.plan_id)])
+
+
+def section_changed(sender, instance, **kwargs):
+    invalidate_government(instance.government_id, ["section:{}".format(instance.id)])
+
+
+def plans_changed(sender, government_id=None, **kwargs):
+    # Bulk changes can affect any page of the government
+    invalidate_government(
+        government_id,
+        ["government:{}".format(government_id)] if government_id else [],
+    )
+
+
+def connect_cache_invalidation():
+    for signal in (post_save, post_delete):
+        signal.connect(government_changed, sender=Government)
+        signal.connect(plan_changed, sender=GovernmentPlan)
+        signal.connect(plan_update_changed, sender=GovernmentPlanUpdate)
+        signal.connect(section_changed, sender=GovernmentPlanSection)
+    government_plans_changed.connect(plans_changed)
@@ -1,8 +1,14 @@
+from django.template import Context
+from django.template.loader import render_to_string
+from django.utils.translation import get_language
 from django.utils.translation import gettext_lazy as _
 
 from cms.plugin_base import CMSPluginBase
 from cms.plugin_pool import plugin_pool
 
+from . import conf
+from .cache import get_or_set_cached, make_cache_key
+from .metrics import instrument
 from .models import (
     PLUGIN_TEMPLATES,
     GovernmentPlansCMSPlugin,
@@ -13,35 +19,100 @@ from .models import (
 )
 
 
+def is_edit_mode(request):
+    toolbar = getattr(request, "toolbar", None)
+    return bool(toolbar and toolbar.edit_mode_active)
+
+
+CACHED_RENDER_TEMPLATE = "froide_govplan/plugins/cached.html"
+
+
+class CachedGovPlanPluginMixin:
+    """
+    Caches the rendered plugin under a key that changes
+    whenever plans, updates or sections of its government change.
+    The CMS must not cache the plugin itself as its cache is not
+    invalidated when the data changes.
+    """
+
+    cache = False
+    cache_key_prefix = None
+
+    def render(self, context, instance, placeholder):
+        context = super().render(context, instance, placeholder)
+        if is_edit_mode(context["request"]):
+            return self.render_data(context, instance, placeholder)
+        key = make_cache_key(
+            self.cache_key_prefix,
+            instance.pk,
+            instance.changed_date.timestamp(),
+            get_language(),
+            government_id=instance.government_id,
+        )
+        context["govplan_rendered"] = get_or_set_cached(
+            key,
+            lambda: self.render_html(context, instance, placeholder),
+            conf.GOVPLAN_PLUGIN_CACHE_TIMEOUT,
+        )
+        return context
+
+    def render_data(self, context, instance, placeholder):
+        raise NotImplementedError
+
+    def render_html(self, context, instance, placeholder):
+        context = self.render_data(context, instance, placeholder)
+        template = self.get_plugin_template(context, instance, placeholder)
+        if isinstance(context, Context):
+            context = context.flatten()
+        return render_to_string(template, context, request=context["request"])
+
+    def get_render_template(self, context, instance, placeholder):
+        if "govplan_rendered" in context:
+            return CACHED_RENDER_TEMPLATE
+        return self.get_plugin_template(context, instance, placeholder)
+
+    def get_plugin_template(self, context, instance, placeholder):
+        return super().get_render_template(context, instance, placeholder)
+
+
 @plugin_pool.register_plugin
-class GovernmentPlansPlugin(CMSPluginBase):
+class GovernmentPlansPlugin(CachedGovPlanPluginMixin, CMSPluginBase):
     name = _("Government plans")
     model = GovernmentPlansCMSPlugin
     filter_horizontal = ("categories",)
-    cache = True
+    cache_key_prefix = "plugin-plans"
 
-    def get_render_template(self, context, instance, placeholder):
+    def get_plugin_template(self, context, instance, placeholder):
         return instance.template or PLUGIN_TEMPLATES[0][0]
 
+    @instrument("plugin_plans")
     def render(self, context, instance, placeholder):
-        context = super().render(context, instance, placeholder)
+        return super().render(context, instance, placeholder)
+
+    def render_data(self, context, instance, placeholder):
+        request = context["request"]
         context["plugin"] = instance
         context["status_list"] = PlanStatus.choices
-        context["object_list"] = instance.get_plans(
-            context["request"], published_only=False
-        )
+        context["object_list"] = list(instance.get_plans(request, published_only=False))
         return context
 
 
 @plugin_pool.register_plugin
-class GovernmentPlanSectionsPlugin(CMSPluginBase):
+class GovernmentPlanSectionsPlugin(CachedGovPlanPluginMixin, CMSPluginBase):
     name = _("Government plan sections")
     model = GovernmentPlanSectionsCMSPlugin
     render_template = "froide_govplan/plugins/sections.html"
+    cache_key_prefix = "plugin-sections"
 
+    @instrument("plugin_sections")
     def render(self, context, instance, placeholder):
-        context = super().render(context, instance, placeholder)
+        return super().render(context, instance, placeholder)
 
+    def render_data(self, context, instance, placeholder):
+        context["sections"] = self.get_sections(instance)
+        return context
+
+    def get_sections(self, instance):
         if instance.government_id:
             sections = GovernmentPlanSection.objects.filter(
                 government_id=instance.government_id
@@ -49,23 +120,27 @@ class GovernmentPlanSectionsPlugin(CMSPluginBase):
         else:
             sections = GovernmentPlanSection.objects.all()
 
-        sections = sections.select_related("government")
-
-        context["sections"] = sections
-
-        return context
+        sections = list(sections.select_related("government"))
+        for section in sections:
+            # Used by the progress bar of each section
+            section.plan_list = list(section.get_plans().only("id", "status"))
+        return sections
 
 
 @plugin_pool.register_plugin
-class GovernmentPlanUpdatesPlugin(CMSPluginBase):
+class GovernmentPlanUpdatesPlugin(CachedGovPlanPluginMixin, CMSPluginBase):
     name = _("Government plan updates")
     model = GovernmentPlanUpdatesCMSPlugin
     render_template = "froide_govplan/plugins/updates.html"
+    cache_key_prefix = "plugin-updates"
 
+    @instrument("plugin_updates")
     def render(self, context, instance, placeholder):
-        context = super().render(context, instance, placeholder)
-        context["updates"] = instance.get_updates(
-            context["request"], published_only=False
+        return super().render(context, instance, placeholder)
+
+    def render_data(self, context, instance, placeholder):
+        context["updates"] = list(
+            instance.get_updates(context["request"], published_only=False)
         )
         context["show_context"] = True
         return context
@@ -2,3 +2,52 @@ from django.conf import settings
 
 GOVPLAN_ENABLE_FOIREQUEST = getattr(settings, "GOVPLAN_ENABLE_FOIREQUEST", True)
 GOVPLAN_NAME = getattr(settings, "GOVPLAN_NAME", "GovPlan")
+# Admin changelists use planner estimates instead of exact counts
+# above this number of rows, None always counts exactly
+GOVPLAN_ADMIN_COUNT_ESTIMATE_THRESHOLD = getattr(
+    settings, "GOVPLAN_ADMIN_COUNT_ESTIMATE_THRESHOLD", 10000
+)
+GOVPLAN_BULK_CHUNK_SIZE = getattr(settings, "GOVPLAN_BULK_CHUNK_SIZE", 500)
+GOVPLAN_PLUGIN_CACHE_TIMEOUT = getattr(
+    settings, "GOVPLAN_PLUGIN_CACHE_TIMEOUT", 60 * 60 * 6
+)
+# Thumbnail options generated in the background when images are saved,
+# they need to match the options of the thumbnail tags in the templates
+GOVPLAN_SECTION_THUMBNAILS = getattr(
+    settings, "GOVPLAN_SECTION_THUMBNAILS", [{"size": (350, 150), "crop": True}]
+)
+# Plan images are not shown by the bundled templates
+GOVPLAN_PLAN_THUMBNAILS = getattr(settings, "GOVPLAN_PLAN_THUMBNAILS", [])
+# Full page cache of plan and section pages for anonymous users
+GOVPLAN_PAGE_CACHE = getattr(settings, "GOVPLAN_PAGE_CACHE", False)
+GOVPLAN_PAGE_CACHE_TIMEOUT = getattr(
+    settings, "GOVPLAN_PAGE_CACHE_TIMEOUT", 60 * 60 * 24
+)
+# Query parameters that are part of the page cache key, all others are ignored
+GOVPLAN_PAGE_CACHE_PARAMS = getattr(settings, "GOVPLAN_PAGE_CACHE_PARAMS", ())
+# Add Surrogate-Key headers with the cache tags of a page for CDNs
+GOVPLAN_PAGE_CACHE_SURROGATE_KEYS = getattr(
+    settings, "GOVPLAN_PAGE_CACHE_SURROGATE_KEYS", False
+)
+# Rendered Atom feeds are cached until plans or updates change
+GOVPLAN_FEED_CACHE_TIMEOUT = getattr(
+    settings, "GOVPLAN_FEED_CACHE_TIMEOUT", 60 * 60 * 6
+)
+# Record query count, database, render time and cache hits per endpoint
+GOVPLAN_METRICS = getattr(settings, "GOVPLAN_METRICS", False)
+GOVPLAN_METRICS_BUCKETS = getattr(
+    settings,
+    "GOVPLAN_METRICS_BUCKETS",
+    (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+# Bearer token for scraping the metrics, staff users can always see them
+GOVPLAN_METRICS_TOKEN = getattr(settings, "GOVPLAN_METRICS_TOKEN", "")
+# Let staff users profile single requests with the query parameter
+# or the X-Govplan-Profile header
+GOVPLAN_PROFILING = getattr(settings, "GOVPLAN_PROFILING", False)
+GOVPLAN_PROFILING_PARAM = getattr(
+    settings, "GOVPLAN_PROFILING_PARAM", "_govplan_profile"
+)
+GOVPLAN_PROFILING_SUMMARY_LINES = getattr(
+    settings, "GOVPLAN_PROFILING_SUMMARY_LINES", 50
+)
@@ -5,7 +5,7 @@ from django.utils.translation import gettext_lazy as _
 from froide.follow.configuration import FollowConfiguration
 from froide.helper.notifications import Notification, TemplatedEvent
 
-from .admin import has_limited_access
+from .auth import get_permission_context, has_limited_access
 from .models import GovernmentPlan, GovernmentPlanFollower, GovernmentPlanUpdate
 
 
@@ -29,7 +29,7 @@ class GovernmentPlanFollowConfiguration(FollowConfiguration):
     }
 
     def get_content_object_queryset(self, request):
-        if has_limited_access(request.user):
+        if get_permission_context(request).limited_access:
             return GovernmentPlan.objects.filter(public=True)
         return GovernmentPlan.objects.all()
 
@@ -0,0 +1,164 @@
+import hashlib
+
+from django.contrib.syndication.views import Feed
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils.feedgenerator import Atom1Feed
+from django.utils.translation import gettext_lazy as _
+from django.views.decorators.http import condition
+
+from . import conf
+from .cache import get_or_set_cached, make_cache_key
+from .metrics import instrument
+from .models import (
+    CategorizedGovernmentPlan,
+    Government,
+    GovernmentPlan,
+    GovernmentPlanSection,
+    GovernmentPlanUpdate,
+)
+
+
+class GovernmentPlanUpdatesFeed(Feed):
+    """
+    Atom feed of the latest public updates of a government.
+
+    Rendered feeds are cached under the government's cache version
+    and served with ETag and Last-Modified headers,
+    so polling clients mostly get 304 responses.
+    """
+
+    feed_type = Atom1Feed
+    cache_prefix = "feed:government"
+    item_count = 30
+
+    @instrument("feed")
+    def __call__(self, request, *args, **kwargs):
+        obj = self.get_object(request, *args, **kwargs)
+        cache_key = make_cache_key(
+            self.cache_prefix, obj.pk, government_id=self.get_government_id(obj)
+        )
+        etag = hashlib.md5(cache_key.encode("utf-8")).hexdigest()
+
+        def get_last_modified(request, *args, **kwargs):
+            return get_or_set_cached(
+                "{}:modified".format(cache_key),
+                lambda: self.get_updates(obj)
+                .values_list("timestamp", flat=True)
+                .first(),
+                conf.GOVPLAN_FEED_CACHE_TIMEOUT,
+            )
+
+        def get_etag(request, *args, **kwargs):
+            return etag
+
+        @condition(etag_func=get_etag, last_modified_func=get_last_modified)
+        def render_feed(request):
+            entry = get_or_set_cached(
+                cache_key,
+                lambda: self.render_feed(obj, request),
+                conf.GOVPLAN_FEED_CACHE_TIMEOUT,
+            )
+            return HttpResponse(entry["content"], content_type=entry["content_type"])
+
+        return render_feed(request)
+
+    def render_feed(self, obj, request):
+        feedgen = self.get_feed(obj, request)
+        response = HttpResponse(content_type=feedgen.content_type)
+        feedgen.write(response, "utf-8")
+        return {"content": response.content, "content_type": response["Content-Type"]}
+
+    def get_object(self, request, gov):
+        return get_object_or_404(Government, slug=gov, public=True)
+
+    def get_government_id(self, obj):
+        return obj.id
+
+    def get_updates(self, obj):
+        return GovernmentPlanUpdate.objects.filter(
+            public=True, plan__public=True, government_id=obj.id
+        ).order_by("-timestamp")
+
+    def title(self, obj):
+        return _("Updates of {name}").format(name=obj.name)
+
+    def link(self, obj):
+        return obj.get_absolute_url()
+
+    def items(self, obj):
+        return self.get_updates(obj).select_related("plan", "plan__government")[
+            : self.item_count
+        ]
+
+    def item_title(self, item):
+        return "{}: {}".format(item.plan.title, item.title)
+
+    def item_description(self, item):
+        return item.content
+
+    def item_link(self, item):
+        return item.get_absolute_url()
+
+    def item_pubdate(self, item):
+        return item.timestamp
+
+    def item_updateddate(self, item):
+        return item.timestamp
+
+
+class GovernmentPlanSectionUpdatesFeed(GovernmentPlanUpdatesFeed):
+    cache_prefix = "feed:section"
+
+    def get_object(self, request, gov, section):
+        return get_object_or_404(
+            GovernmentPlanSection.objects.select_related("government"),
+            government__slug=gov,
+            government__public=True,
+            slug=section,
+        )
+
+    def get_government_id(self, obj):
+        return obj.government_id
+
+    def get_updates(self, obj):
+        return GovernmentPlanUpdate.objects.filter(
+            public=True,
+            plan__public=True,
+            government_id=obj.government_id,
+            plan_id__in=CategorizedGovernmentPlan.objects.filter(
+                tag_id__in=obj.categories.all().values("id")
+            ).values("content_object_id"),
+        ).order_by("-timestamp")
+
+    def title(self, obj):
+        return _("Updates of {name}: {title}").format(
+            name=obj.government.name, title=obj.title
+        )
+
+
+class GovernmentPlanUpdatesPlanFeed(GovernmentPlanUpdatesFeed):
+    cache_prefix = "feed:plan"
+
+    def get_object(self, request, gov, plan):
+        return get_object_or_404(
+            GovernmentPlan.objects.select_related("government"),
+            government__slug=gov,
+            government__public=True,
+            slug=plan,
+            public=True,
+        )
+
+    def get_government_id(self, obj):
+        return obj.government_id
+
+    def get_updates(self, obj):
+        return GovernmentPlanUpdate.objects.filter(public=True, plan=obj).order_by(
+            "-timestamp"
+        )
+
+    def title(self, obj):
+        return _("Updates of {title}").format(title=obj.title)
+
+    def item_title(self, item):
+        return item.title
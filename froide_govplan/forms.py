@@ -1,8 +1,8 @@
-import copy
+from functools import partial
 
 from django import forms
-from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.db import transaction
 from django.utils import timezone
 from django.utils.safestring import mark_safe
 from django.utils.translation import gettext_lazy as _
@@ -14,6 +14,8 @@ from tinymce.widgets import TinyMCE
 from froide.helper.widgets import BootstrapSelect
 
 from .models import GovernmentPlan, GovernmentPlanUpdate, PlanRating, PlanStatus
+from .signals import government_plans_changed
+from .tasks import send_proposal_accepted_mail
 
 BLEACH_OPTIONS = {
     "tags": [
@@ -61,7 +63,8 @@ class GovernmentPlanForm(forms.ModelForm):
 
     class Meta:
         model = GovernmentPlan
-        fields = "__all__"
+        # Proposals are changed in place, saving a stale copy would drop new ones
+        exclude = ("proposals",)
 
 
 class GovernmentPlanUpdateForm(forms.ModelForm):
@@ -74,6 +77,59 @@ class GovernmentPlanUpdateForm(forms.ModelForm):
         fields = "__all__"
 
 
+class GovernmentPlanBulkUpdateForm(forms.ModelForm):
+    content = BleachField(
+        required=False, widget=TinyMCE(attrs={"cols": 80, "rows": 15})
+    )
+
+    class Meta:
+        model = GovernmentPlanUpdate
+        fields = (
+            "title",
+            "timestamp",
+            "content",
+            "url",
+            "status",
+            "rating",
+            "public",
+        )
+
+    @transaction.atomic
+    def save(self, plans, user=None, autofill_organization=False):
+        """
+        Creates one update with the form data for each plan.
+        With autofill_organization, updates get the organization of their plan.
+        """
+        plans = list(plans)
+        data = {field: self.cleaned_data[field] for field in self._meta.fields}
+        updates = GovernmentPlanUpdate.objects.bulk_create(
+            [
+                GovernmentPlanUpdate(
+                    plan=plan,
+                    government_id=plan.government_id,
+                    user=user,
+                    organization_id=(
+                        plan.organization_id if autofill_organization else None
+                    ),
+                    **data,
+                )
+                for plan in plans
+            ]
+        )
+
+        plan_qs = GovernmentPlan.objects.filter(id__in=[p.id for p in plans])
+        plan_qs.update(updated=timezone.now())
+        changed = GovernmentPlan.objects.update_from_updates(qs=plan_qs)
+        # update_from_updates already notified the governments of changed plans,
+        # the new updates still need to invalidate the others
+        notified = {p.government_id for p in changed}
+        for government_id in {p.government_id for p in plans} - notified:
+            government_plans_changed.send(
+                sender=GovernmentPlan, government_id=government_id
+            )
+        return updates
+
+
 class GovernmentPlanUpdateProposalForm(forms.ModelForm):
     title = forms.CharField(
         label=_("title"),
@@ -133,12 +189,14 @@ class GovernmentPlanUpdateProposalForm(forms.ModelForm):
         the change proposal.
         """
         data = self.cleaned_data
-        plan.proposals = plan.proposals or {}
-        plan.proposals[user.id] = {
-            "data": data,
-            "timestamp": timezone.now().isoformat(),
-        }
-        plan.save(update_fields=["proposals"])
+        GovernmentPlan.objects.set_proposal(
+            plan,
+            str(user.id),
+            {
+                "data": data,
+                "timestamp": timezone.now().isoformat(),
+            },
+        )
         return plan
 
 
@@ -148,23 +206,29 @@ class GovernmentPlanUpdateAcceptProposalForm(GovernmentPlanUpdateProposalForm):
         super().__init__(*args, **kwargs)
 
     def get_proposals(self):
-        data = copy.deepcopy(self.plan.proposals)
-        user_ids = self.plan.proposals.keys()
+        proposals = self.plan.proposals or {}
         user_map = {
-            str(u.id): u for u in get_user_model().objects.filter(id__in=user_ids)
+            str(u.id): u
+            for u in get_user_model()
+            .objects.filter(id__in=proposals.keys())
+            .prefetch_related("organization_set")
         }
         status_dict = dict(PlanStatus.choices)
         rating_dict = dict(PlanRating.choices)
-        for user_id, v in data.items():
-            v["user"] = user_map[user_id]
-            data[user_id]["data"]["rating_label"] = rating_dict.get(
-                data[user_id]["data"]["rating"]
-            )
-            data[user_id]["data"]["status_label"] = status_dict.get(
-                data[user_id]["data"]["status"]
-            )
+        data = {}
+        for user_id, proposal in proposals.items():
+            data[user_id] = {
+                **proposal,
+                "user": user_map[user_id],
+                "data": {
+                    **proposal["data"],
+                    "rating_label": rating_dict.get(proposal["data"]["rating"]),
+                    "status_label": status_dict.get(proposal["data"]["status"]),
+                },
+            }
         return data
 
+    @transaction.atomic
     def save(
         self,
         proposal_id=None,
@@ -178,13 +242,10 @@ class GovernmentPlanUpdateAcceptProposalForm(GovernmentPlanUpdateProposalForm):
         if proposal_id:
             proposals = self.get_proposals()
             proposal_user = proposals[proposal_id]["user"]
-            proposal_user.send_mail(
-                _("Your proposal for the plan “%s” was accepted") % self.plan.title,
-                _(
-                    "Hello,\n\nA moderator has accepted your proposal for an update to the plan "
-                    "“{title}”. An update will be published soon.\n\nAll the Best,\n{site_name}"
-                ).format(title=self.plan.title, site_name=settings.SITE_NAME),
-                priority=False,
+            transaction.on_commit(
+                partial(
+                    send_proposal_accepted_mail.delay, proposal_user.id, self.plan.id
+                )
             )
             user_org = proposal_user.organization_set.all().first()
             if user_org:
@@ -196,9 +257,4 @@ class GovernmentPlanUpdateAcceptProposalForm(GovernmentPlanUpdateProposalForm):
         return update
 
     def delete_proposals(self, delete_proposals):
-        for pid in delete_proposals:
-            if pid in self.plan.proposals:
-                del self.plan.proposals[pid]
-        if not self.plan.proposals:
-            self.plan.proposals = None
-        self.plan.save(update_fields=["proposals"])
+        GovernmentPlan.objects.delete_proposals(self.plan, delete_proposals)
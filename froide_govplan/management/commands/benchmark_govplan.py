@@ -0,0 +1,247 @@
+import contextlib
+import io
+import json
+import statistics
+import time
+from urllib.parse import urlparse
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.template.loader import render_to_string
+from django.test import Client, RequestFactory
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import NoReverseMatch, reverse
+from django.utils import timezone
+
+from ...api_views import GovernmentPlanViewSet
+from ...models import (
+    PLUGIN_TEMPLATES,
+    GovernmentPlan,
+    GovernmentPlanSection,
+    GovernmentPlansCMSPlugin,
+    GovernmentPlanSectionsCMSPlugin,
+    GovernmentPlanUpdatesCMSPlugin,
+)
+from ...plan_importer import PlanImporter
+from ...synthetic import WORDS, create_synthetic_data, make_import_rows
+from ...views import search
+
+IMPORT_MAPPING = {
+    "title": "title",
+    "reference": "reference",
+    "status": "status",
+    "categories": "categories",
+}
+
+BENCHMARK_CACHE = {
+    "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    "LOCATION": "govplan-benchmark",
+}
+
+
+def measure(func, repeat):
+    """
+    Runs func repeat times and returns its latencies and query counts.
+    The first run is reported separately as it runs with cold caches.
+    """
+    timings = []
+    query_counts = []
+    for _ in range(repeat):
+        with CaptureQueriesContext(connection) as ctx:
+            start = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - start) * 1000)
+        query_counts.append(len(ctx.captured_queries))
+    warm = timings[1:] or timings
+    return {
+        "runs": repeat,
+        "first_ms": round(timings[0], 3),
+        "median_ms": round(statistics.median(warm), 3),
+        "min_ms": round(min(warm), 3),
+        "max_ms": round(max(warm), 3),
+        "first_queries": query_counts[0],
+        "queries": query_counts[-1],
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmarks govplan views, plugins, API and importer "
+        "against synthetic data that is rolled back afterwards"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--governments", type=int, default=1)
+        parser.add_argument("--plans", type=int, default=200)
+        parser.add_argument("--updates", type=int, default=5)
+        parser.add_argument("--sections", type=int, default=5)
+        parser.add_argument("--followers", type=int, default=2)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--import-rows", type=int, default=50)
+        parser.add_argument(
+            "--cache",
+            type=str,
+            default="",
+            help="Alias in CACHES to use during the run, defaults to local memory",
+        )
+        parser.add_argument(
+            "--output", type=str, default="", help="JSON file, defaults to stdout"
+        )
+
+    def handle(self, *args, **options):
+        self.repeat = max(options["repeat"], 1)
+        self.factory = RequestFactory()
+        site_url = urlparse(settings.SITE_URL)
+        self.client = Client(HTTP_HOST=site_url.netloc)
+        self.secure = site_url.scheme == "https"
+
+        dataset = {
+            key: options[key]
+            for key in (
+                "governments",
+                "plans",
+                "updates",
+                "sections",
+                "followers",
+                "seed",
+            )
+        }
+        # Cached pages, plugin data and metrics of the synthetic data
+        # would outlive the rollback, so the run gets its own cache
+        cache_config = (
+            settings.CACHES[options["cache"]] if options["cache"] else BENCHMARK_CACHE
+        )
+        started = timezone.now()
+        with override_settings(CACHES={"default": cache_config}):
+            with transaction.atomic():
+                seed_start = time.perf_counter()
+                governments = create_synthetic_data(**dataset)
+                dataset["seed_seconds"] = round(time.perf_counter() - seed_start, 3)
+
+                self.results = {}
+                government = governments[0]
+                self.benchmark_search()
+                self.benchmark_pages(government)
+                self.benchmark_plugins(government)
+                self.benchmark_api(government)
+                self.benchmark_importer(government, options["import_rows"])
+                transaction.set_rollback(True)
+
+        output = json.dumps(
+            {
+                "started": started.isoformat(),
+                "cache": options["cache"] or "locmem",
+                "dataset": dataset,
+                "results": self.results,
+            },
+            indent=2,
+        )
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                f.write(output)
+        else:
+            self.stdout.write(output)
+
+    def run(self, name, func):
+        try:
+            self.results[name] = measure(func, self.repeat)
+        except Exception as e:
+            self.results[name] = {"error": repr(e)}
+
+    def make_request(self, path="/", params=None):
+        request = self.factory.get(path, params or {})
+        request.user = AnonymousUser()
+        return request
+
+    def benchmark_search(self):
+        self.run("search", lambda: search(self.make_request()))
+        self.run(
+            "search_query",
+            lambda: search(self.make_request(params={"q": WORDS[0]})),
+        )
+
+    def benchmark_pages(self, government):
+        plan = GovernmentPlan.objects.filter(government=government, public=True).first()
+        section = GovernmentPlanSection.objects.filter(government=government).first()
+        pages = {
+            "plan_detail": (
+                "govplan:plan",
+                {"gov": government.slug, "plan": plan.slug},
+            ),
+            "section_detail": (
+                "govplan:section",
+                {"gov": government.slug, "section": section.slug},
+            ),
+        }
+        for name, (url_name, kwargs) in pages.items():
+            try:
+                url = reverse(url_name, kwargs=kwargs)
+            except NoReverseMatch:
+                # The app is not hooked into a CMS page
+                self.results[name] = {"skipped": "no URL for {}".format(url_name)}
+                continue
+            self.run(name, lambda url=url: self.get_page(url))
+
+    def get_page(self, url):
+        response = self.client.get(url, secure=self.secure)
+        if response.status_code != 200:
+            raise ValueError("{} returned {}".format(url, response.status_code))
+
+    def benchmark_plugins(self, government):
+        plugin_kwargs = {"language": settings.LANGUAGE_CODE, "position": 0}
+        plugins = {
+            "plugin_plans_{}".format(template.rsplit("/", 1)[-1][:-5]): (
+                GovernmentPlansCMSPlugin.objects.create(
+                    plugin_type="GovernmentPlansPlugin",
+                    government=government,
+                    template=template,
+                    count=20,
+                    **plugin_kwargs,
+                )
+            )
+            for template, _label in PLUGIN_TEMPLATES
+        }
+        plugins["plugin_sections"] = GovernmentPlanSectionsCMSPlugin.objects.create(
+            plugin_type="GovernmentPlanSectionsPlugin",
+            government=government,
+            **plugin_kwargs,
+        )
+        plugins["plugin_updates"] = GovernmentPlanUpdatesCMSPlugin.objects.create(
+            plugin_type="GovernmentPlanUpdatesPlugin",
+            government=government,
+            count=10,
+            **plugin_kwargs,
+        )
+        for name, instance in plugins.items():
+            self.run(name, lambda instance=instance: self.render_plugin(instance))
+
+    def render_plugin(self, instance):
+        request = self.make_request()
+        plugin = instance.get_plugin_class_instance()
+        context = plugin.render({"request": request}, instance, None)
+        template = plugin.get_render_template(context, instance, None)
+        render_to_string(template, context, request=request)
+
+    def benchmark_api(self, government):
+        view = GovernmentPlanViewSet.as_view({"get": "list"})
+        self.run("api_list", lambda: view(self.make_request()).render())
+        params = {"government": government.id}
+        self.run(
+            "api_list_government",
+            lambda: view(self.make_request(params=params)).render(),
+        )
+
+    def benchmark_importer(self, government, count):
+        runs = iter(range(self.repeat))
+
+        def import_rows():
+            rows = make_import_rows(government, count, seed=next(runs))
+            importer = PlanImporter(government, col_mapping=IMPORT_MAPPING)
+            # The importer prints every row
+            with contextlib.redirect_stdout(io.StringIO()):
+                importer.import_rows(rows)
+
+        self.run("importer", import_rows)
@@ -0,0 +1,164 @@
+import gzip
+import json
+from pathlib import Path
+from urllib.parse import urlparse
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+from django.test import Client
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from ...models import (
+    CategorizedGovernmentPlan,
+    Government,
+    GovernmentPlan,
+    GovernmentPlanSection,
+)
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+MANIFEST_NAME = ".govplan-export.json"
+
+
+class Command(BaseCommand):
+    help = "Renders all public governments, sections and plans to static files"
+
+    def add_arguments(self, parser):
+        parser.add_argument("output_dir", type=str)
+        parser.add_argument(
+            "--incremental",
+            action="store_true",
+            help=(
+                "Only render plan pages whose plan, section or government "
+                "changed since the last export"
+            ),
+        )
+
+    def handle(self, *args, **options):
+        self.output_dir = Path(options["output_dir"])
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        manifest_path = self.output_dir / MANIFEST_NAME
+
+        manifest = {}
+        if manifest_path.exists():
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+        since = None
+        if options["incremental"] and manifest.get("exported_at"):
+            since = parse_datetime(manifest["exported_at"])
+
+        site_url = urlparse(settings.SITE_URL)
+        self.client = Client(HTTP_HOST=site_url.netloc)
+        self.secure = site_url.scheme == "https"
+
+        started = timezone.now()
+        paths = set()
+        rendered = 0
+
+        governments = Government.objects.filter(public=True)
+        sections = GovernmentPlanSection.objects.filter(
+            government__public=True
+        ).select_related("government")
+        plans = GovernmentPlan.objects.filter(
+            public=True, government__public=True
+        ).select_related("government")
+
+        # Governments with a planning document link to an external site
+        listing_paths = {
+            gov.get_absolute_url().rstrip("/") + "/"
+            for gov in governments
+            if not urlparse(gov.get_absolute_url()).netloc
+        }
+        listing_paths |= {section.get_absolute_url() for section in sections}
+        for path in listing_paths:
+            self.export_page(path)
+            paths.add(path)
+            rendered += 1
+
+        section_ids = {str(section.id): section.government_id for section in sections}
+        changed_plan_ids = None
+        if since is not None:
+            changed_plan_ids = self.get_changed_plan_ids(
+                plans, since, manifest.get("sections", {}), section_ids
+            )
+
+        for plan in plans.only("slug", "government__slug").iterator():
+            path = plan.get_absolute_url()
+            paths.add(path)
+            if changed_plan_ids is not None and plan.id not in changed_plan_ids:
+                continue
+            self.export_page(path)
+            rendered += 1
+
+        removed = set(manifest.get("paths", [])) - paths
+        for path in removed:
+            self.remove_page(path)
+
+        with open(manifest_path, "w") as f:
+            json.dump(
+                {
+                    "exported_at": started.isoformat(),
+                    "paths": sorted(paths),
+                    "sections": section_ids,
+                },
+                f,
+            )
+
+        self.stdout.write(
+            "Rendered {} pages, removed {}, {} pages in export.\n".format(
+                rendered, len(removed), len(paths)
+            )
+        )
+
+    def get_changed_plan_ids(self, plans, since, old_section_ids, section_ids):
+        """
+        Returns the plans whose page may have changed since the last export.
+        Plan pages also show their government and their section.
+        """
+        government_ids = set(
+            Government.objects.filter(updated__gte=since).values_list("id", flat=True)
+        )
+        # Plans of deleted sections may now show another section or none
+        government_ids |= {
+            government_id
+            for section_id, government_id in old_section_ids.items()
+            if section_id not in section_ids
+        }
+        changed_sections = GovernmentPlanSection.objects.filter(updated__gte=since)
+        section_plan_ids = CategorizedGovernmentPlan.objects.filter(
+            tag_id__in=changed_sections.values("categories")
+        ).values("content_object_id")
+        return set(
+            plans.filter(
+                Q(updated__gte=since)
+                | Q(government_id__in=government_ids)
+                | Q(id__in=section_plan_ids)
+            ).values_list("id", flat=True)
+        )
+
+    def get_page_filename(self, path):
+        return self.output_dir / path.lstrip("/") / "index.html"
+
+    def export_page(self, path):
+        response = self.client.get(path, secure=self.secure)
+        if response.status_code != 200:
+            raise CommandError(
+                "Could not render {}: status {}".format(path, response.status_code)
+            )
+        content = response.content
+        filename = self.get_page_filename(path)
+        filename.parent.mkdir(parents=True, exist_ok=True)
+        filename.write_bytes(content)
+        Path("{}.gz".format(filename)).write_bytes(gzip.compress(content, 9))
+        if brotli is not None:
+            Path("{}.br".format(filename)).write_bytes(brotli.compress(content))
+
+    def remove_page(self, path):
+        filename = self.get_page_filename(path)
+        for suffix in ("", ".gz", ".br"):
+            Path("{}{}".format(filename, suffix)).unlink(missing_ok=True)
@@ -0,0 +1,60 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from ...models import Government
+from ...synthetic import create_synthetic_data
+
+
+class Command(BaseCommand):
+    help = (
+        "Generates synthetic governments, sections, plans, updates and followers. "
+        "A scale of 1 creates one government with about 17,000 rows."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--scale", type=int, default=1, help="Number of governments"
+        )
+        parser.add_argument("--plans", type=int, default=1000)
+        parser.add_argument("--updates", type=int, default=10)
+        parser.add_argument("--sections", type=int, default=10)
+        parser.add_argument("--followers", type=int, default=5)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        prefix = "synthetic-{}-".format(options["seed"])
+        if Government.objects.filter(slug__startswith=prefix).exists():
+            raise CommandError(
+                "Data for seed {} already exists, use another seed.".format(
+                    options["seed"]
+                )
+            )
+
+        def progress(government, count):
+            self.stdout.write(
+                "{}: {} of {} plans\n".format(government.slug, count, options["plans"])
+            )
+
+        with transaction.atomic():
+            governments = create_synthetic_data(
+                governments=options["scale"],
+                plans=options["plans"],
+                updates=options["updates"],
+                sections=options["sections"],
+                followers=options["followers"],
+                seed=options["seed"],
+                batch_size=options["batch_size"],
+                progress=progress,
+            )
+
+        plan_count = len(governments) * options["plans"]
+        self.stdout.write(
+            "Generated {} governments with {} plans, {} updates "
+            "and {} followers.\n".format(
+                len(governments),
+                plan_count,
+                plan_count * options["updates"],
+                plan_count * options["followers"],
+            )
+        )
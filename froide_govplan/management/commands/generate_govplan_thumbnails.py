@@ -0,0 +1,31 @@
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from ...thumbnails import generate_thumbnails, get_thumbnail_jobs
+from ...utils import close_connections_before_fork, setup_worker_process
+
+
+def run_job(job):
+    kind, pk = job
+    return generate_thumbnails(kind, pk)
+
+
+class Command(BaseCommand):
+    help = "Generates thumbnails of all plan and section images"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=4)
+
+    def handle(self, *args, **options):
+        jobs = list(get_thumbnail_jobs())
+
+        close_connections_before_fork()
+        with ProcessPoolExecutor(
+            max_workers=options["workers"], initializer=setup_worker_process
+        ) as executor:
+            count = sum(executor.map(run_job, jobs, chunksize=10))
+
+        self.stdout.write(
+            "Generated {} thumbnails for {} images.\n".format(count, len(jobs))
+        )
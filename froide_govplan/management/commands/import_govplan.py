@@ -1,4 +1,3 @@
-import csv
 import json
 
 from django.core.management.base import BaseCommand
@@ -23,9 +22,6 @@ class Command(BaseCommand):
 
         importer = PlanImporter(government, col_mapping=col_mapping)
 
-        filename = options["filename"]
-        with open(filename) as csv_file:
-            reader = csv.DictReader(csv_file)
-            importer.import_rows(reader)
+        importer.import_file(options["filename"])
 
         self.stdout.write("Import done.\n")
@@ -0,0 +1,79 @@
+import json
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ...utils import close_connections_before_fork, setup_worker_process
+
+
+def run_import(entry):
+    from ...models import Government
+    from ...plan_importer import PlanImporter
+
+    try:
+        government = Government.objects.get(slug=entry["government"])
+        with open(entry["mapping"]) as f:
+            col_mapping = json.load(f)
+        importer = PlanImporter(government, col_mapping=col_mapping)
+        importer.import_file(entry["filename"])
+    except Exception as e:
+        return {"government": entry["government"], "error": str(e)}
+    return importer.get_results()
+
+
+class Command(BaseCommand):
+    help = "Imports plans of several governments in parallel"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "manifest",
+            type=str,
+            help="JSON file with a list of government, mapping and filename entries",
+        )
+        parser.add_argument("--workers", type=int, default=4)
+
+    def handle(self, *args, **options):
+        with open(options["manifest"]) as f:
+            manifest = json.load(f)
+
+        for entry in manifest:
+            missing = {"government", "mapping", "filename"} - set(entry)
+            if missing:
+                raise CommandError(
+                    "Manifest entry {} is missing {}".format(
+                        entry, ", ".join(sorted(missing))
+                    )
+                )
+
+        results = []
+        close_connections_before_fork()
+        with ProcessPoolExecutor(
+            max_workers=options["workers"], initializer=setup_worker_process
+        ) as executor:
+            futures = [executor.submit(run_import, entry) for entry in manifest]
+            for future in as_completed(futures):
+                result = future.result()
+                results.append(result)
+                if result.get("error"):
+                    self.stderr.write(
+                        "{government}: failed: {error}\n".format(**result)
+                    )
+                else:
+                    self.stdout.write(
+                        "{government}: {created} created, {updated} updated, "
+                        "{skipped} skipped\n".format(**result)
+                    )
+
+        failed = [r for r in results if r.get("error")]
+        totals = {
+            key: sum(r.get(key, 0) for r in results)
+            for key in ("created", "updated", "skipped")
+        }
+        self.stdout.write(
+            "Import done: {} governments, {} failed, {created} created, "
+            "{updated} updated, {skipped} skipped.\n".format(
+                len(results), len(failed), **totals
+            )
+        )
+        if failed:
+            raise CommandError("{} imports failed.".format(len(failed)))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from ...models import GovernmentPlan
+
+
+class Command(BaseCommand):
+    help = "Updates status and rating of plans from their public updates"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--government", type=str, help="Only update plans of this government"
+        )
+
+    def handle(self, *args, **options):
+        plans = GovernmentPlan.objects.all()
+        if options["government"]:
+            plans = plans.filter(government__slug=options["government"])
+
+        changed = GovernmentPlan.objects.update_from_updates(qs=plans)
+
+        self.stdout.write("Updated {} plans.\n".format(len(changed)))
@@ -0,0 +1,196 @@
+"""
+Opt-in metrics of govplan views, API and plugins.
+
+Query count, database time, render time and cache hits are recorded
+per endpoint in the Django cache, so all worker processes report
+to the same counters. They are exposed in Prometheus text format.
+"""
+
+import functools
+import time
+from contextvars import ContextVar
+
+from django.core.cache import cache
+from django.db import connection
+
+from . import conf
+
+ENDPOINTS = set()
+COUNTERS = (
+    "requests",
+    "duration_us",
+    "render_us",
+    "queries",
+    "db_us",
+    "cache_hits",
+    "cache_misses",
+)
+
+current_metrics = ContextVar("govplan_metrics", default=None)
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_time += time.perf_counter() - start
+
+
+def instrument(name):
+    """
+    Records metrics of every call of the decorated view or method
+    under the endpoint name. Calls inside another instrumented call
+    count towards the outer endpoint.
+    """
+    ENDPOINTS.add(name)
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not conf.GOVPLAN_METRICS or current_metrics.get() is not None:
+                return func(*args, **kwargs)
+
+            metrics = RequestMetrics()
+            token = current_metrics.set(metrics)
+            try:
+                with connection.execute_wrapper(metrics):
+                    start = time.perf_counter()
+                    result = func(*args, **kwargs)
+                    render_start = time.perf_counter()
+                    # Template responses are rendered lazily
+                    if getattr(result, "is_rendered", True) is False:
+                        result.render()
+                    end = time.perf_counter()
+            finally:
+                current_metrics.reset(token)
+            record_metrics(name, metrics, end - start, end - render_start)
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def record_cache_access(hit):
+    metrics = current_metrics.get()
+    if metrics is None:
+        return
+    if hit:
+        metrics.cache_hits += 1
+    else:
+        metrics.cache_misses += 1
+
+
+def get_metric_key(name, counter):
+    return "govplan:metrics:{}:{}".format(name, counter)
+
+
+def increment(key, delta):
+    if not cache.add(key, delta, None):
+        try:
+            cache.incr(key, delta)
+        except ValueError:
+            cache.set(key, delta, None)
+
+
+def record_metrics(name, metrics, duration, render_time):
+    values = {
+        "requests": 1,
+        "duration_us": int(duration * 1e6),
+        "render_us": int(render_time * 1e6),
+        "queries": metrics.queries,
+        "db_us": int(metrics.db_time * 1e6),
+        "cache_hits": metrics.cache_hits,
+        "cache_misses": metrics.cache_misses,
+    }
+    for i, bucket in enumerate(conf.GOVPLAN_METRICS_BUCKETS):
+        if duration <= bucket:
+            values["bucket_{}".format(i)] = 1
+            break
+    for counter, value in values.items():
+        if value:
+            increment(get_metric_key(name, counter), value)
+
+
+def format_labels(**labels):
+    return ",".join('{}="{}"'.format(key, value) for key, value in labels.items())
+
+
+def render_prometheus():
+    buckets = conf.GOVPLAN_METRICS_BUCKETS
+    keys = [
+        get_metric_key(name, counter)
+        for name in ENDPOINTS
+        for counter in COUNTERS
+        + tuple("bucket_{}".format(i) for i in range(len(buckets)))
+    ]
+    values = cache.get_many(keys)
+
+    def get(name, counter):
+        return values.get(get_metric_key(name, counter), 0)
+
+    lines = [
+        "# HELP govplan_request_duration_seconds Duration of govplan endpoints.",
+        "# TYPE govplan_request_duration_seconds histogram",
+    ]
+    for name in sorted(ENDPOINTS):
+        cumulative = 0
+        for i, bucket in enumerate(buckets):
+            cumulative += get(name, "bucket_{}".format(i))
+            lines.append(
+                "govplan_request_duration_seconds_bucket{{{}}} {}".format(
+                    format_labels(endpoint=name, le=bucket), cumulative
+                )
+            )
+        labels = format_labels(endpoint=name)
+        lines.extend(
+            [
+                "govplan_request_duration_seconds_bucket{{{}}} {}".format(
+                    format_labels(endpoint=name, le="+Inf"), get(name, "requests")
+                ),
+                "govplan_request_duration_seconds_sum{{{}}} {}".format(
+                    labels, get(name, "duration_us") / 1e6
+                ),
+                "govplan_request_duration_seconds_count{{{}}} {}".format(
+                    labels, get(name, "requests")
+                ),
+            ]
+        )
+
+    counters = [
+        ("govplan_render_seconds_total", "Render time.", "render_us", 1e6),
+        ("govplan_db_queries_total", "Database queries.", "queries", 1),
+        ("govplan_db_seconds_total", "Database time.", "db_us", 1e6),
+    ]
+    for metric, help_text, counter, divisor in counters:
+        lines.append("# HELP {} {}".format(metric, help_text))
+        lines.append("# TYPE {} counter".format(metric))
+        for name in sorted(ENDPOINTS):
+            value = get(name, counter)
+            lines.append(
+                "{}{{{}}} {}".format(
+                    metric,
+                    format_labels(endpoint=name),
+                    value / divisor if divisor != 1 else value,
+                )
+            )
+
+    lines.append("# HELP govplan_cache_requests_total Cache lookups.")
+    lines.append("# TYPE govplan_cache_requests_total counter")
+    for name in sorted(ENDPOINTS):
+        for result, counter in (("hit", "cache_hits"), ("miss", "cache_misses")):
+            lines.append(
+                "govplan_cache_requests_total{{{}}} {}".format(
+                    format_labels(endpoint=name, result=result), get(name, counter)
+                )
+            )
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,18 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("froide_govplan", "0013_government_active"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="governmentplan",
+            index=models.Index(
+                condition=models.Q(("proposals__isnull", False)),
+                fields=["id"],
+                name="govplan_pending_proposals_idx",
+            ),
+        ),
+    ]
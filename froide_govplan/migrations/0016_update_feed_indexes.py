@@ -0,0 +1,29 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("froide_govplan", "0015_governmentplan_title_trgm_idx"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="categorizedgovernmentplan",
+            index=models.Index(
+                fields=["tag", "content_object"], name="govplan_categorized_tag_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="governmentplanupdate",
+            index=models.Index(
+                fields=["public", "-timestamp"], name="govplan_update_feed_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="governmentplanupdate",
+            index=models.Index(
+                fields=["plan", "public", "-timestamp"],
+                name="govplan_update_plan_feed_idx",
+            ),
+        ),
+    ]
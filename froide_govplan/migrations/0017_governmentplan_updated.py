@@ -0,0 +1,21 @@
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("froide_govplan", "0016_update_feed_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="governmentplan",
+            name="updated",
+            field=models.DateTimeField(
+                auto_now=True,
+                default=django.utils.timezone.now,
+                verbose_name="updated",
+            ),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,49 @@
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("froide_govplan", "0017_governmentplan_updated"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="governmentplan",
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.search.CombinedSearchVector(
+                    django.contrib.postgres.search.CombinedSearchVector(
+                        django.contrib.postgres.search.SearchVector(
+                            "title", config="german", weight="A"
+                        ),
+                        "||",
+                        django.contrib.postgres.search.SearchVector(
+                            "description", config="german", weight="B"
+                        ),
+                        django.contrib.postgres.search.SearchConfig("german"),
+                    ),
+                    "||",
+                    django.contrib.postgres.search.SearchVector(
+                        "quote", config="german", weight="B"
+                    ),
+                    django.contrib.postgres.search.SearchConfig("german"),
+                ),
+                name="govplan_search_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="governmentplan",
+            index=models.Index(
+                condition=models.Q(("public", True)),
+                fields=["government", "status"],
+                name="govplan_public_status_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="governmentplan",
+            index=models.Index(
+                fields=["reference", "title"], name="govplan_ordering_idx"
+            ),
+        ),
+    ]
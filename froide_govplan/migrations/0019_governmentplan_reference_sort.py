@@ -0,0 +1,48 @@
+import re
+
+from django.db import migrations, models
+
+REFERENCE_NUMBER_RE = re.compile(r"\d+")
+
+
+def fill_reference_sort(apps, schema_editor):
+    GovernmentPlan = apps.get_model("froide_govplan", "GovernmentPlan")
+    plans = list(GovernmentPlan.objects.only("id", "reference"))
+    for plan in plans:
+        plan.reference_sort = REFERENCE_NUMBER_RE.sub(
+            lambda m: m.group(0).zfill(8), plan.reference
+        )[:255]
+    GovernmentPlan.objects.bulk_update(plans, ["reference_sort"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("froide_govplan", "0018_governmentplan_hot_query_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="governmentplan",
+            name="reference_sort",
+            field=models.CharField(blank=True, editable=False, max_length=255),
+        ),
+        migrations.RunPython(fill_reference_sort, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name="governmentplan",
+            name="govplan_ordering_idx",
+        ),
+        migrations.AddIndex(
+            model_name="governmentplan",
+            index=models.Index(
+                fields=["reference_sort", "title"], name="govplan_ordering_idx"
+            ),
+        ),
+        migrations.AlterModelOptions(
+            name="governmentplan",
+            options={
+                "ordering": ("reference_sort", "title"),
+                "verbose_name": "Government plan",
+                "verbose_name_plural": "Government plans",
+            },
+        ),
+    ]
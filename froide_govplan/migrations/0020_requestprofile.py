@@ -0,0 +1,63 @@
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("froide_govplan", "0019_governmentplan_reference_sort"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RequestProfile",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "timestamp",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now, verbose_name="timestamp"
+                    ),
+                ),
+                ("endpoint", models.CharField(max_length=255, verbose_name="endpoint")),
+                ("path", models.CharField(max_length=1024, verbose_name="path")),
+                ("duration", models.FloatField(verbose_name="duration (seconds)")),
+                (
+                    "query_count",
+                    models.PositiveIntegerField(verbose_name="query count"),
+                ),
+                (
+                    "db_time",
+                    models.FloatField(verbose_name="database time (seconds)"),
+                ),
+                ("queries", models.JSONField(default=list, verbose_name="queries")),
+                ("summary", models.TextField(blank=True, verbose_name="summary")),
+                ("stats", models.BinaryField(verbose_name="profile stats")),
+                (
+                    "user",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="user",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Request profile",
+                "verbose_name_plural": "Request profiles",
+                "ordering": ("-timestamp",),
+            },
+        ),
+    ]
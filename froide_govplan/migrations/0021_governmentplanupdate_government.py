@@ -0,0 +1,44 @@
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def fill_update_government(apps, schema_editor):
+    GovernmentPlan = apps.get_model("froide_govplan", "GovernmentPlan")
+    GovernmentPlanUpdate = apps.get_model("froide_govplan", "GovernmentPlanUpdate")
+    GovernmentPlanUpdate.objects.update(
+        government_id=Subquery(
+            GovernmentPlan.objects.filter(id=OuterRef("plan_id")).values(
+                "government_id"
+            )
+        )
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("froide_govplan", "0020_requestprofile"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="governmentplanupdate",
+            name="government",
+            field=models.ForeignKey(
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="plan_updates",
+                to="froide_govplan.government",
+                verbose_name="government",
+            ),
+        ),
+        migrations.RunPython(fill_update_government, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="governmentplanupdate",
+            index=models.Index(
+                fields=["government", "public", "-timestamp"],
+                name="govplan_update_gov_feed_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,31 @@
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("froide_govplan", "0021_governmentplanupdate_government"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="government",
+            name="updated",
+            field=models.DateTimeField(
+                auto_now=True,
+                default=django.utils.timezone.now,
+                verbose_name="updated",
+            ),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name="governmentplansection",
+            name="updated",
+            field=models.DateTimeField(
+                auto_now=True,
+                default=django.utils.timezone.now,
+                verbose_name="updated",
+            ),
+            preserve_default=False,
+        ),
+    ]
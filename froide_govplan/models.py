@@ -5,8 +5,12 @@ from urllib.parse import urlparse
 
 from django.conf import settings
 from django.contrib.auth.models import Group
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex, OpClass
 from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
 from django.db import models
+from django.db.models import Func, Value
+from django.db.models.functions import Cast, Coalesce, NullIf, Upper
 from django.urls import reverse
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
@@ -19,6 +23,7 @@ from taggit.managers import TaggableManager
 from taggit.models import TaggedItemBase
 
 from . import conf
+from .signals import government_plans_changed
 from .utils import make_request_url
 
 try:
@@ -86,6 +91,7 @@ class Government(models.Model):
     active = models.BooleanField(default=True, verbose_name=_("active"))
 
     planning_document = models.URLField(blank=True, verbose_name=_("planning document"))
+    updated = models.DateTimeField(auto_now=True, verbose_name=_("updated"))
 
     class Meta:
         verbose_name = _("Government")
@@ -136,24 +142,62 @@ class CategorizedGovernmentPlan(TaggedItemBase):
     class Meta:
         verbose_name = _("Categorized Government Plan")
         verbose_name_plural = _("Categorized Government Plans")
+        indexes = [
+            models.Index(
+                fields=["tag", "content_object"],
+                name="govplan_categorized_tag_idx",
+            ),
+        ]
 
 
 WORD_RE = re.compile(r"^\w+$", re.IGNORECASE)
+REFERENCE_NUMBER_RE = re.compile(r"\d+")
+
+
+def make_reference_sort(reference):
+    """
+    Returns a key that sorts references in paragraph order,
+    e.g. "2" before "12, 130", by zero-padding all numbers.
+    """
+    return REFERENCE_NUMBER_RE.sub(lambda m: m.group(0).zfill(8), reference)[:255]
+
+
+class JSONBSet(Func):
+    function = "jsonb_set"
+    output_field = models.JSONField()
+
+
+class JSONBDeleteKeys(Func):
+    arg_joiner = " - "
+    template = "(%(expressions)s)"
+    output_field = models.JSONField()
+
+
+def make_text_array(values):
+    array_field = ArrayField(models.TextField())
+    return Cast(Value([str(v) for v in values], output_field=array_field), array_field)
+
+
+SEARCH_LANG = "german"
+SEARCH_FIELDS = [
+    ("title", "A"),
+    ("description", "B"),
+    ("quote", "B"),
+]
+
+
+def get_search_vector():
+    return functools.reduce(
+        lambda a, b: a + b,
+        [SearchVector(f, weight=w, config=SEARCH_LANG) for f, w in SEARCH_FIELDS],
+    )
 
 
 class GovernmentPlanManager(models.Manager):
-    SEARCH_LANG = "german"
+    SEARCH_LANG = SEARCH_LANG
 
     def get_search_vector(self):
-        fields = [
-            ("title", "A"),
-            ("description", "B"),
-            ("quote", "B"),
-        ]
-        return functools.reduce(
-            lambda a, b: a + b,
-            [SearchVector(f, weight=w, config=self.SEARCH_LANG) for f, w in fields],
-        )
+        return get_search_vector()
 
     def search(self, query, qs=None):
         if not qs:
@@ -180,12 +224,86 @@ class GovernmentPlanManager(models.Manager):
 
         search_vector = self.get_search_vector()
         qs = (
-            qs.annotate(rank=SearchRank(search_vector, search_query))
+            # Match against the indexed search vector before ranking
+            qs.annotate(search=search_vector)
+            .filter(search=search_query)
+            .annotate(rank=SearchRank(search_vector, search_query))
             .filter(rank__gte=0.1)
             .order_by("-rank")
         )
         return qs
 
+    def update_from_updates(self, qs=None):
+        """
+        Set status and rating of plans from their latest public updates.
+        A plan keeps its status or rating if no public update sets it,
+        e.g. when it was imported or set by hand.
+        Only plans whose status or rating changes are written.
+        Returns the list of changed plans.
+        """
+        if qs is None:
+            qs = self.get_queryset()
+        plan_ids = qs.values("id")
+
+        updates = GovernmentPlanUpdate.objects.filter(
+            plan_id__in=plan_ids, public=True
+        ).order_by("plan_id", "-timestamp")
+        latest_status = dict(
+            updates.exclude(status="")
+            .distinct("plan_id")
+            .values_list("plan_id", "status")
+        )
+        latest_rating = dict(
+            updates.exclude(rating=None)
+            .distinct("plan_id")
+            .values_list("plan_id", "rating")
+        )
+
+        changed = []
+        now = timezone.now()
+        plans = self.get_queryset().filter(
+            id__in=set(latest_status) | set(latest_rating)
+        )
+        for plan in plans.only("id", "government_id", "status", "rating"):
+            status = latest_status.get(plan.id, plan.status)
+            rating = latest_rating.get(plan.id, plan.rating)
+            if plan.status != status or plan.rating != rating:
+                plan.status = status
+                plan.rating = rating
+                plan.updated = now
+                changed.append(plan)
+
+        self.bulk_update(changed, ["status", "rating", "updated"], batch_size=1000)
+        for government_id in {plan.government_id for plan in changed}:
+            government_plans_changed.send(
+                sender=self.model, government_id=government_id
+            )
+        return changed
+
+    def set_proposal(self, plan, key, proposal):
+        """
+        Sets a single proposal in place so concurrent
+        proposals on the same plan don't overwrite each other.
+        """
+        self.filter(pk=plan.pk).update(
+            proposals=JSONBSet(
+                Coalesce("proposals", Value({}, output_field=models.JSONField())),
+                make_text_array([key]),
+                Value(proposal, output_field=models.JSONField()),
+            )
+        )
+        plan.refresh_from_db(fields=["proposals"])
+
+    def delete_proposals(self, plan, keys):
+        if keys:
+            self.filter(pk=plan.pk).update(
+                proposals=NullIf(
+                    JSONBDeleteKeys("proposals", make_text_array(keys)),
+                    Value({}, output_field=models.JSONField()),
+                )
+            )
+        plan.refresh_from_db(fields=["proposals"])
+
 
 class GovernmentPlan(models.Model):
     government = models.ForeignKey(
@@ -221,6 +339,7 @@ class GovernmentPlan(models.Model):
     reference = models.CharField(
         max_length=255, blank=True, verbose_name=_("reference")
     )
+    reference_sort = models.CharField(max_length=255, blank=True, editable=False)
 
     categories = TaggableManager(
         through=CategorizedGovernmentPlan, verbose_name=_("categories"), blank=True
@@ -248,16 +367,50 @@ class GovernmentPlan(models.Model):
     proposals = models.JSONField(blank=True, null=True)
     properties = models.JSONField(blank=True, default=dict)
 
+    updated = models.DateTimeField(auto_now=True, verbose_name=_("updated"))
+
     objects = GovernmentPlanManager()
 
     class Meta:
-        ordering = ("reference", "title")
+        ordering = ("reference_sort", "title")
         verbose_name = _("Government plan")
         verbose_name_plural = _("Government plans")
+        indexes = [
+            models.Index(
+                fields=["id"],
+                condition=models.Q(proposals__isnull=False),
+                name="govplan_pending_proposals_idx",
+            ),
+            # Supports case-insensitive title search in admin autocomplete
+            GinIndex(
+                OpClass(Upper("title"), name="gin_trgm_ops"),
+                name="govplan_title_trgm_idx",
+            ),
+            GinIndex(get_search_vector(), name="govplan_search_idx"),
+            models.Index(
+                fields=["government", "status"],
+                condition=models.Q(public=True),
+                name="govplan_public_status_idx",
+            ),
+            models.Index(
+                fields=["reference_sort", "title"], name="govplan_ordering_idx"
+            ),
+        ]
 
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        self.reference_sort = make_reference_sort(self.reference)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "reference" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "reference_sort"}
+        super().save(*args, **kwargs)
+        if update_fields is None or "government" in update_fields:
+            self.updates.exclude(government_id=self.government_id).update(
+                government_id=self.government_id
+            )
+
     def get_absolute_url(self):
         return reverse(
             "govplan:plan", kwargs={"gov": self.government.slug, "plan": self.slug}
@@ -281,23 +434,22 @@ class GovernmentPlan(models.Model):
         ]
 
     def get_section(self):
-        return GovernmentPlanSection.objects.filter(
-            categories__in=self.categories.all()
-        ).first()
+        if not hasattr(self, "_section"):
+            self._section = GovernmentPlanSection.objects.filter(
+                categories__in=self.categories.all()
+            ).first()
+        return self._section
 
     def update_from_updates(self):
-        last_status_update = (
-            self.updates.all().filter(public=True).exclude(status="").first()
+        # Only status, rating and updated are written
+        # so concurrent changes like proposals are kept
+        changed = GovernmentPlan.objects.update_from_updates(
+            qs=GovernmentPlan.objects.filter(id=self.id)
         )
-        if last_status_update:
-            self.status = last_status_update.status
-        last_rating_update = (
-            self.updates.all().filter(public=True).exclude(rating=None).first()
-        )
-        if last_rating_update:
-            self.rating = last_rating_update.rating
-        if last_status_update or last_rating_update:
-            self.save()
+        for plan in changed:
+            self.status = plan.status
+            self.rating = plan.rating
+            self.updated = plan.updated
 
     def get_status_css(self):
         return STATUS_CSS.get(self.status, "")
@@ -345,6 +497,16 @@ class GovernmentPlanUpdate(models.Model):
         related_name="updates",
         verbose_name=_("plan"),
     )
+    # Copy of the plan's government, so the latest updates
+    # of a government can be read from one index
+    government = models.ForeignKey(
+        Government,
+        null=True,
+        editable=False,
+        on_delete=models.CASCADE,
+        related_name="plan_updates",
+        verbose_name=_("government"),
+    )
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         null=True,
@@ -390,6 +552,29 @@ class GovernmentPlanUpdate(models.Model):
         get_latest_by = "timestamp"
         verbose_name = _("Plan update")
         verbose_name_plural = _("Plan updates")
+        indexes = [
+            # Latest updates of all plans, filtered by government or
+            # category through the plan
+            models.Index(
+                fields=["public", "-timestamp"],
+                name="govplan_update_feed_idx",
+            ),
+            models.Index(
+                fields=["plan", "public", "-timestamp"],
+                name="govplan_update_plan_feed_idx",
+            ),
+            models.Index(
+                fields=["government", "public", "-timestamp"],
+                name="govplan_update_gov_feed_idx",
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.government_id = self.plan.government_id
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "plan" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "government"}
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return "{} - {} ({})".format(self.title, self.timestamp, self.plan)
@@ -452,6 +637,7 @@ class GovernmentPlanSection(models.Model):
     )
     order = models.PositiveIntegerField(default=0)
     featured = models.DateTimeField(null=True, blank=True)
+    updated = models.DateTimeField(auto_now=True, verbose_name=_("updated"))
 
     if PlaceholderField:
         content_placeholder = PlaceholderField("content")
@@ -486,6 +672,34 @@ class GovernmentPlanSection(models.Model):
         return queryset.distinct().order_by("title")
 
 
+class RequestProfile(models.Model):
+    timestamp = models.DateTimeField(default=timezone.now, verbose_name=_("timestamp"))
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        verbose_name=_("user"),
+    )
+    endpoint = models.CharField(max_length=255, verbose_name=_("endpoint"))
+    path = models.CharField(max_length=1024, verbose_name=_("path"))
+    duration = models.FloatField(verbose_name=_("duration (seconds)"))
+    query_count = models.PositiveIntegerField(verbose_name=_("query count"))
+    db_time = models.FloatField(verbose_name=_("database time (seconds)"))
+    queries = models.JSONField(default=list, verbose_name=_("queries"))
+    summary = models.TextField(blank=True, verbose_name=_("summary"))
+    # Marshalled cProfile stats as written by pstats.Stats.dump_stats
+    stats = models.BinaryField(verbose_name=_("profile stats"))
+
+    class Meta:
+        ordering = ("-timestamp",)
+        verbose_name = _("Request profile")
+        verbose_name_plural = _("Request profiles")
+
+    def __str__(self):
+        return "{} ({})".format(self.path, self.timestamp)
+
+
 if CMSPlugin:
     PLUGIN_TEMPLATES = [
         ("froide_govplan/plugins/default.html", _("Normal")),
@@ -496,6 +710,24 @@ if CMSPlugin:
         ("froide_govplan/plugins/search.html", _("Search")),
     ]
 
+    # Large plan fields that a plugin template does not render
+    PLAN_TEXT_FIELDS = ("description", "quote", "proposals", "properties")
+    PLUGIN_TEMPLATE_DEFERRED_FIELDS = {
+        "froide_govplan/plugins/default.html": PLAN_TEXT_FIELDS,
+        "froide_govplan/plugins/progress.html": PLAN_TEXT_FIELDS,
+        "froide_govplan/plugins/progress_row.html": PLAN_TEXT_FIELDS,
+        "froide_govplan/plugins/card_cols.html": (
+            "description",
+            "proposals",
+            "properties",
+        ),
+    }
+    # Templates that don't render the plan list
+    PLUGIN_TEMPLATES_WITHOUT_PLANS = (
+        "froide_govplan/plugins/time_used.html",
+        "froide_govplan/plugins/search.html",
+    )
+
     class GovernmentPlansCMSPlugin(CMSPlugin):
         """
         CMS Plugin for displaying latest articles
@@ -545,6 +777,9 @@ if CMSPlugin:
             return _("%s matching plans") % self.count
 
         def get_plans(self, request, published_only=True):
+            template = self.template or PLUGIN_TEMPLATES[0][0]
+            if template in PLUGIN_TEMPLATES_WITHOUT_PLANS:
+                return GovernmentPlan.objects.none()
             if (
                 published_only
                 or not request
@@ -555,16 +790,20 @@ if CMSPlugin:
             else:
                 plans = GovernmentPlan.objects.all()
 
-            filters = {}
             if self.government_id:
-                filters["government_id"] = self.government_id
+                plans = plans.filter(government_id=self.government_id)
 
-            cat_list = self.categories.all().values_list("id", flat=True)
+            cat_list = list(self.categories.all().values_list("id", flat=True))
             if cat_list:
-                filters["categories__in"] = cat_list
+                plans = plans.filter(
+                    id__in=CategorizedGovernmentPlan.objects.filter(
+                        tag_id__in=cat_list
+                    ).values("content_object_id")
+                )
 
-            plans = plans.filter(**filters).distinct()
-            plans = plans.prefetch_related("categories", "government", "organization")
+            plans = plans.select_related("government").defer(
+                *PLUGIN_TEMPLATE_DEFERRED_FIELDS.get(template, ())
+            )
             if self.count == 0:
                 return plans[self.offset :]
             return plans[self.offset : self.offset + self.count]
@@ -617,19 +856,22 @@ if CMSPlugin:
             else:
                 updates = GovernmentPlanUpdate.objects.all()
 
-            updates = updates.order_by("-timestamp").prefetch_related(
-                "plan", "plan__categories"
-            )
-
-            filters = {}
             if self.government_id:
-                filters["plan__government_id"] = self.government_id
+                updates = updates.filter(government_id=self.government_id)
 
-            cat_list = self.categories.all().values_list("id", flat=True)
+            cat_list = list(self.categories.all().values_list("id", flat=True))
             if cat_list:
-                filters["plan__categories__in"] = cat_list
+                updates = updates.filter(
+                    plan_id__in=CategorizedGovernmentPlan.objects.filter(
+                        tag_id__in=cat_list
+                    ).values("content_object_id")
+                )
 
-            updates = updates.filter(**filters).distinct()
+            updates = updates.order_by("-timestamp").select_related(
+                "plan", "plan__government", "user", "organization"
+            )
+            if FoiRequest:
+                updates = updates.select_related("foirequest")
             if self.count == 0:
                 return updates[self.offset :]
             return updates[self.offset : self.offset + self.count]
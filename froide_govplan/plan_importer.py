@@ -1,6 +1,8 @@
+import csv
 import datetime
 import re
 
+from django.db import transaction
 from django.template.defaultfilters import slugify
 
 from froide.publicbody.models import Category, PublicBody
@@ -15,15 +17,32 @@ class PlanImporter(object):
         self.col_mapping = col_mapping
         self.government = government
         self.post_save_list = []
+        self.created = 0
+        self.updated = 0
+        self.skipped = 0
 
     def import_rows(self, reader):
         for row in reader:
             self.import_row(row)
 
+    def import_file(self, filename):
+        with open(filename) as csv_file:
+            reader = csv.DictReader(csv_file)
+            self.import_rows(reader)
+
+    def get_results(self):
+        return {
+            "government": self.government.slug,
+            "created": self.created,
+            "updated": self.updated,
+            "skipped": self.skipped,
+        }
+
     def import_row(self, row):
         print("importing", row)
         title = row[self.col_mapping["title"]]
         if not title:
+            self.skipped += 1
             return
         plan = GovernmentPlan.objects.filter(
             government=self.government, title=title
@@ -31,6 +50,9 @@ class PlanImporter(object):
 
         if not plan:
             plan = GovernmentPlan(government=self.government)
+            self.created += 1
+        else:
+            self.updated += 1
 
         self.post_save_list = []
         for col, row_col in self.col_mapping.items():
@@ -57,14 +79,18 @@ class PlanImporter(object):
 
     def make_section(self, section_name, section_slug, categories):
         slug = slugify(section_slug)
-        section, _created = GovernmentPlanSection.objects.get_or_create(
-            slug=slug,
-            defaults={
-                "government": self.government,
-                "title": section_name,
-            },
-        )
-        section.categories.set([self.get_category(c) for c in categories])
+        with transaction.atomic():
+            GovernmentPlanSection.objects.get_or_create(
+                slug=slug,
+                defaults={
+                    "government": self.government,
+                    "title": section_name,
+                },
+            )
+            # Lock the section so concurrent imports don't interleave
+            # their category updates
+            section = GovernmentPlanSection.objects.select_for_update().get(slug=slug)
+            section.categories.set([self.get_category(c) for c in categories])
 
     def get_category(self, cat_name):
         return Category.objects.get(name=cat_name)
@@ -0,0 +1,96 @@
+"""
+On-demand profiling of single govplan requests by staff users.
+
+With GOVPLAN_PROFILING enabled, a staff user can add the profiling
+query parameter or header to a request. The request is then run under
+cProfile, its SQL is captured with timings and the result is stored
+as a RequestProfile that can be downloaded from the admin.
+"""
+
+import cProfile
+import functools
+import io
+import marshal
+import pstats
+import time
+
+from django.db import connection
+
+from . import conf
+from .models import RequestProfile
+
+PROFILE_HEADER = "X-Govplan-Profile"
+
+
+class QueryRecorder:
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append(
+                {"sql": sql, "time": time.perf_counter() - start, "many": many}
+            )
+
+
+def wants_profile(request):
+    if conf.GOVPLAN_PROFILING_PARAM not in request.GET and (
+        PROFILE_HEADER not in request.headers
+    ):
+        return False
+    return request.user.is_authenticated and request.user.is_staff
+
+
+def profile_request(name):
+    """
+    Profiles the decorated view when a staff user asks for it.
+    """
+
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not conf.GOVPLAN_PROFILING or not wants_profile(request):
+                return view(request, *args, **kwargs)
+            return run_profiled(name, view, request, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def run_profiled(name, view, request, *args, **kwargs):
+    profiler = cProfile.Profile()
+    recorder = QueryRecorder()
+    with connection.execute_wrapper(recorder):
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            response = view(request, *args, **kwargs)
+            # Include lazy template rendering in the profile
+            if getattr(response, "is_rendered", True) is False:
+                response.render()
+        finally:
+            profiler.disable()
+        duration = time.perf_counter() - start
+
+    profiler.create_stats()
+    summary = io.StringIO()
+    pstats.Stats(profiler, stream=summary).sort_stats("cumulative").print_stats(
+        conf.GOVPLAN_PROFILING_SUMMARY_LINES
+    )
+    profile = RequestProfile.objects.create(
+        user=request.user,
+        endpoint=name,
+        path=request.get_full_path()[:1024],
+        duration=duration,
+        query_count=len(recorder.queries),
+        db_time=sum(q["time"] for q in recorder.queries),
+        queries=recorder.queries,
+        summary=summary.getvalue(),
+        stats=marshal.dumps(profiler.stats),
+    )
+    response[PROFILE_HEADER] = str(profile.id)
+    return response
@@ -0,0 +1,11 @@
+from django.dispatch import Signal
+
+# Sent once per affected government after plans were changed in bulk
+# without going through model save signals.
+# Receivers get the government_id keyword argument.
+government_plans_changed = Signal()
+
+# Sent after pages with any of the given cache tags were purged.
+# Receivers get the tags keyword argument, e.g. to purge a CDN
+# by Surrogate-Key.
+cache_tags_purged = Signal()
@@ -0,0 +1,256 @@
+"""
+Synthetic governments, plans, updates, sections and followers
+for benchmarks and local performance testing.
+"""
+
+import datetime
+import random
+
+from froide.publicbody.models import Category
+
+from .models import (
+    CategorizedGovernmentPlan,
+    Government,
+    GovernmentPlan,
+    GovernmentPlanFollower,
+    GovernmentPlanSection,
+    GovernmentPlanUpdate,
+    PlanRating,
+    PlanStatus,
+    make_reference_sort,
+)
+
+# Fixed so that the same seed always generates the same data
+BASE_DATE = datetime.datetime(2022, 1, 1, tzinfo=datetime.timezone.utc)
+
+WORDS = [
+    "Bund",
+    "Länder",
+    "Kommunen",
+    "Förderung",
+    "Klimaschutz",
+    "Digitalisierung",
+    "Verwaltung",
+    "Bildung",
+    "Forschung",
+    "Gesundheit",
+    "Pflege",
+    "Mobilität",
+    "Wohnungsbau",
+    "Energie",
+    "Transparenz",
+    "Gesetz",
+    "Reform",
+    "Modernisierung",
+    "Entlastung",
+    "Familien",
+    "Arbeit",
+    "Rente",
+    "Integration",
+    "Landwirtschaft",
+    "Verbraucherschutz",
+]
+ADJECTIVES = [
+    "bundesweite",
+    "nachhaltige",
+    "digitale",
+    "soziale",
+    "schnellere",
+    "gerechte",
+    "moderne",
+    "verbindliche",
+    "unbürokratische",
+    "transparente",
+]
+VERBS = [
+    "einführen",
+    "ausbauen",
+    "stärken",
+    "vereinfachen",
+    "überprüfen",
+    "fördern",
+    "reformieren",
+    "gesetzlich regeln",
+    "weiterentwickeln",
+    "beschleunigen",
+]
+SUBJECTS = [
+    "Wir werden",
+    "Die Bundesregierung wird",
+    "Das Ministerium wird",
+    "Gemeinsam mit den Ländern werden wir",
+    "Im Laufe der Legislaturperiode werden wir",
+]
+UPDATE_TITLES = [
+    "Referentenentwurf veröffentlicht",
+    "Kabinettsbeschluss",
+    "Erste Lesung im Bundestag",
+    "Anhörung im Ausschuss",
+    "Gesetz verabschiedet",
+    "Förderprogramm gestartet",
+    "Eckpunkte vorgestellt",
+    "Vorhaben verschoben",
+]
+
+
+def make_sentence(rng):
+    return "{} die {} {} {}.".format(
+        rng.choice(SUBJECTS),
+        rng.choice(ADJECTIVES),
+        rng.choice(WORDS),
+        rng.choice(VERBS),
+    )
+
+
+def make_paragraph(rng, sentences):
+    return " ".join(make_sentence(rng) for _ in range(sentences))
+
+
+def make_plan_title(rng):
+    return "{} {} {}".format(
+        rng.choice(ADJECTIVES).capitalize(), rng.choice(WORDS), rng.choice(VERBS)
+    )
+
+
+def make_plan(rng, government, number):
+    reference = str(number)
+    return GovernmentPlan(
+        government=government,
+        title=make_plan_title(rng),
+        slug="{}-plan-{}".format(government.slug, number),
+        description=make_paragraph(rng, rng.randint(3, 10)),
+        quote=make_sentence(rng),
+        public=rng.random() < 0.95,
+        status=rng.choice(PlanStatus.values),
+        rating=rng.choice(PlanRating.values),
+        reference=reference,
+        reference_sort=make_reference_sort(reference),
+        due_date=(BASE_DATE + datetime.timedelta(days=rng.randint(0, 1500))).date(),
+    )
+
+
+def make_plan_relations(rng, plan, categories, updates, followers):
+    if categories:
+        yield CategorizedGovernmentPlan(tag=rng.choice(categories), content_object=plan)
+    for _ in range(updates):
+        yield GovernmentPlanUpdate(
+            plan=plan,
+            government_id=plan.government_id,
+            timestamp=BASE_DATE
+            + datetime.timedelta(minutes=rng.randint(0, 60 * 24 * 1400)),
+            title=rng.choice(UPDATE_TITLES),
+            content=make_paragraph(rng, rng.randint(1, 5)),
+            status=rng.choice(PlanStatus.values),
+            rating=rng.choice(PlanRating.values),
+            public=rng.random() < 0.9,
+        )
+    for i in range(followers):
+        yield GovernmentPlanFollower(
+            content_object=plan,
+            email="{}-{}@example.org".format(plan.slug, i),
+            confirmed=True,
+        )
+
+
+def create_synthetic_data(
+    governments=1,
+    plans=100,
+    updates=5,
+    sections=5,
+    followers=2,
+    seed=0,
+    batch_size=1000,
+    progress=None,
+):
+    """
+    Creates governments with the given number of plans, updates per plan,
+    sections and followers per plan. The data is deterministic for a seed.
+    Returns the created governments.
+    """
+    prefix = "synthetic-{}".format(seed)
+
+    government_list = Government.objects.bulk_create(
+        [
+            Government(
+                name="Regierung {} {}".format(seed, i + 1),
+                slug="{}-{}".format(prefix, i),
+                public=True,
+                start_date=BASE_DATE.date(),
+                end_date=(BASE_DATE + datetime.timedelta(days=365 * 4)).date(),
+            )
+            for i in range(governments)
+        ]
+    )
+
+    for government in government_list:
+        rng = random.Random(government.slug)
+        categories = [
+            Category.add_root(
+                name="{} {}-{}".format(rng.choice(WORDS), government.slug, i),
+                slug="{}-category-{}".format(government.slug, i),
+            )
+            for i in range(sections)
+        ]
+        section_list = GovernmentPlanSection.objects.bulk_create(
+            [
+                GovernmentPlanSection(
+                    government=government,
+                    title=category.name,
+                    slug="{}-section-{}".format(government.slug, i),
+                    description=make_paragraph(rng, 3),
+                    order=i,
+                )
+                for i, category in enumerate(categories)
+            ]
+        )
+        for section, category in zip(section_list, categories):
+            section.categories.set([category])
+
+        for start in range(0, plans, batch_size):
+            numbers = range(start + 1, min(start + batch_size, plans) + 1)
+            # Every plan has its own random generator so that the data
+            # doesn't depend on the batch size
+            rngs = [
+                random.Random("{}-{}".format(government.slug, number))
+                for number in numbers
+            ]
+            plan_list = GovernmentPlan.objects.bulk_create(
+                [
+                    make_plan(plan_rng, government, number)
+                    for plan_rng, number in zip(rngs, numbers)
+                ]
+            )
+            relations = {}
+            for plan_rng, plan in zip(rngs, plan_list):
+                for obj in make_plan_relations(
+                    plan_rng, plan, categories, updates, followers
+                ):
+                    relations.setdefault(type(obj), []).append(obj)
+            for model, objs in relations.items():
+                model.objects.bulk_create(objs, batch_size=batch_size)
+            if progress is not None:
+                progress(government, start + len(plan_list))
+
+    return government_list
+
+
+def make_import_rows(government, count, seed=0):
+    """
+    Returns CSV-like rows for the plan importer
+    using the categories of the government's sections.
+    """
+    rng = random.Random(seed)
+    categories = list(
+        Category.objects.filter(
+            governmentplansection__government=government
+        ).values_list("name", flat=True)
+    )
+    return [
+        {
+            "title": "{} {}".format(make_plan_title(rng), government.slug),
+            "reference": "{}, {}".format(rng.randint(1, 150), rng.randint(1, 150)),
+            "status": rng.choice(["noch nicht umgesetzt", "begonnen", "umgesetzt"]),
+            "categories": rng.choice(categories) if categories else "",
+        }
+        for _ in range(count)
+    ]
@@ -0,0 +1,40 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.utils.translation import gettext_lazy as _
+from django.utils.translation import override
+
+from froide.celery import app as celery_app
+
+from .bulk import execute_bulk_job
+from .models import GovernmentPlan
+from .thumbnails import generate_thumbnails
+
+
+@celery_app.task(name="froide_govplan.tasks.send_proposal_accepted_mail")
+def send_proposal_accepted_mail(user_id, plan_id):
+    User = get_user_model()
+    try:
+        user = User.objects.get(id=user_id)
+        plan = GovernmentPlan.objects.get(id=plan_id)
+    except (User.DoesNotExist, GovernmentPlan.DoesNotExist):
+        return
+
+    with override(settings.LANGUAGE_CODE):
+        user.send_mail(
+            _("Your proposal for the plan “%s” was accepted") % plan.title,
+            _(
+                "Hello,\n\nA moderator has accepted your proposal for an update to the plan "
+                "“{title}”. An update will be published soon.\n\nAll the Best,\n{site_name}"
+            ).format(title=plan.title, site_name=settings.SITE_NAME),
+            priority=False,
+        )
+
+
+@celery_app.task(name="froide_govplan.tasks.run_bulk_job")
+def run_bulk_job(job_id, action, plan_ids, kwargs):
+    execute_bulk_job(job_id, action, plan_ids, kwargs)
+
+
+@celery_app.task(name="froide_govplan.tasks.generate_thumbnails")
+def generate_thumbnails_task(kind, pk):
+    generate_thumbnails(kind, pk)
@@ -41,7 +41,10 @@ def get_plan_progress(object_list):
 
 @register.inclusion_tag("froide_govplan/plugins/progress.html")
 def get_section_progress(section):
-    return {"object_list": section.get_plans()}
+    plans = getattr(section, "plan_list", None)
+    if plans is None:
+        plans = section.get_plans()
+    return {"object_list": plans}
 
 
 @register.filter
@@ -0,0 +1,77 @@
+from django.db import connection
+from django.test import TestCase
+
+from froide_govplan.api_views import GovernmentPlanViewSet
+from froide_govplan.models import (
+    GovernmentPlan,
+    GovernmentPlanSection,
+    GovernmentPlanUpdatesCMSPlugin,
+)
+from froide_govplan.synthetic import WORDS, create_synthetic_data
+
+
+class HotQueryIndexTest(TestCase):
+    """
+    Checks that the hot queries can use their indexes. Sequential
+    scans are disabled so that the small seeded tables still show
+    which indexes the planner is able to use.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.government = create_synthetic_data(
+            governments=2, plans=200, updates=3, sections=3, followers=0
+        )[0]
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    def setUp(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+
+    def assertUsesIndex(self, queryset, *index_names):
+        plan = queryset.explain()
+        self.assertTrue(
+            any(name in plan for name in index_names),
+            "None of {} used by:\n{}".format(", ".join(index_names), plan),
+        )
+
+    def test_detail_updates(self):
+        plan = GovernmentPlan.objects.filter(government=self.government).first()
+        updates = plan.updates.filter(public=True).order_by("-timestamp")
+        self.assertUsesIndex(updates, "govplan_update_plan_feed_idx")
+
+    def test_section_plans(self):
+        section = GovernmentPlanSection.objects.filter(
+            government=self.government
+        ).first()
+        plans = section.get_plans(queryset=GovernmentPlan.objects.filter(public=True))
+        self.assertUsesIndex(
+            plans, "govplan_categorized_tag_idx", "govplan_public_status_idx"
+        )
+
+    def test_search(self):
+        plans = GovernmentPlan.objects.search(
+            WORDS[0], qs=GovernmentPlan.objects.filter(public=True)
+        )
+        self.assertUsesIndex(plans, "govplan_search_idx")
+
+    def test_api_list(self):
+        plans = GovernmentPlanViewSet().get_queryset()[:50]
+        self.assertUsesIndex(plans, "govplan_ordering_idx")
+
+    def test_api_list_government(self):
+        plans = (
+            GovernmentPlanViewSet().get_queryset().filter(government=self.government)
+        )
+        self.assertUsesIndex(plans, "govplan_public_status_idx", "govplan_ordering_idx")
+
+    def test_updates_plugin(self):
+        instance = GovernmentPlanUpdatesCMSPlugin.objects.create(
+            plugin_type="GovernmentPlanUpdatesPlugin",
+            language="en",
+            position=0,
+            government=self.government,
+            count=10,
+        )
+        self.assertUsesIndex(instance.get_updates(None), "govplan_update_gov_feed_idx")
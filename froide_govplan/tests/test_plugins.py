@@ -0,0 +1,91 @@
+import time
+
+from django.test import TestCase
+
+from froide.publicbody.models import Category
+
+from froide_govplan.models import (
+    PLUGIN_TEMPLATE_DEFERRED_FIELDS,
+    PLUGIN_TEMPLATES,
+    PLUGIN_TEMPLATES_WITHOUT_PLANS,
+    CategorizedGovernmentPlan,
+    Government,
+    GovernmentPlan,
+    GovernmentPlansCMSPlugin,
+)
+
+PLAN_COUNT = 30
+
+
+class GovernmentPlansPluginTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.government = Government.objects.create(name="Test", slug="test")
+        other_government = Government.objects.create(name="Other", slug="other")
+        cls.categories = [
+            Category.add_root(
+                name="Category {}".format(i), slug="category-{}".format(i)
+            )
+            for i in range(2)
+        ]
+        for i in range(PLAN_COUNT):
+            plan = GovernmentPlan.objects.create(
+                government=cls.government,
+                title="Plan {}".format(i),
+                slug="plan-{}".format(i),
+                description="Description " * 100,
+                quote="Quote",
+                public=True,
+            )
+            # Every plan is in both categories
+            for category in cls.categories:
+                CategorizedGovernmentPlan.objects.create(
+                    tag=category, content_object=plan
+                )
+        GovernmentPlan.objects.create(
+            government=other_government, title="Other plan", slug="other", public=True
+        )
+
+    def make_plugin(self, template):
+        instance = GovernmentPlansCMSPlugin.objects.create(
+            plugin_type="GovernmentPlansPlugin",
+            language="en",
+            position=0,
+            government=self.government,
+            template=template,
+            count=0,
+        )
+        instance.categories.set(self.categories)
+        return instance
+
+    def test_get_plans_for_each_template(self):
+        for template, _label in PLUGIN_TEMPLATES:
+            with self.subTest(template=template):
+                instance = self.make_plugin(template)
+                without_plans = template in PLUGIN_TEMPLATES_WITHOUT_PLANS
+                # The plugin's categories and the plans with their government
+                with self.assertNumQueries(0 if without_plans else 2):
+                    start = time.perf_counter()
+                    plans = list(instance.get_plans(None))
+                    for plan in plans:
+                        plan.title, plan.status, plan.government.name
+                    duration = time.perf_counter() - start
+                self.assertLess(duration, 0.5)
+
+                if without_plans:
+                    self.assertEqual(plans, [])
+                    continue
+                # Plans in several categories are listed once
+                self.assertEqual(len(plans), PLAN_COUNT)
+                self.assertEqual(
+                    plans[0].get_deferred_fields(),
+                    set(PLUGIN_TEMPLATE_DEFERRED_FIELDS.get(template, ())),
+                )
+
+    def test_get_plans_filters_without_distinct(self):
+        instance = self.make_plugin(PLUGIN_TEMPLATES[0][0])
+        sql = str(instance.get_plans(None).query)
+        self.assertNotIn("DISTINCT", sql)
+        self.assertNotIn(
+            "JOIN", sql.replace('INNER JOIN "froide_govplan_government"', "")
+        )
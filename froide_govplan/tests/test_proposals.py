@@ -0,0 +1,102 @@
+import threading
+
+from django.db import connection
+from django.test import TransactionTestCase
+
+from froide_govplan.forms import GovernmentPlanForm
+from froide_govplan.models import (
+    Government,
+    GovernmentPlan,
+    GovernmentPlanUpdate,
+    PlanStatus,
+)
+
+
+class ProposalUpdateTest(TransactionTestCase):
+    def setUp(self):
+        government = Government.objects.create(name="Test", slug="test")
+        self.plan = GovernmentPlan.objects.create(
+            government=government, title="Plan", slug="plan"
+        )
+
+    def get_plan(self):
+        return GovernmentPlan.objects.get(pk=self.plan.pk)
+
+    def run_concurrently(self, funcs):
+        barrier = threading.Barrier(len(funcs))
+        errors = []
+
+        def run(func):
+            try:
+                barrier.wait()
+                func()
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=run, args=(func,)) for func in funcs]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+
+    def test_concurrent_set_proposal(self):
+        keys = [str(i) for i in range(10)]
+        self.run_concurrently(
+            [
+                lambda key=key: GovernmentPlan.objects.set_proposal(
+                    self.get_plan(), key, {"title": key}
+                )
+                for key in keys
+            ]
+        )
+        self.assertEqual(
+            self.get_plan().proposals, {key: {"title": key} for key in keys}
+        )
+
+    def test_concurrent_set_and_delete_proposals(self):
+        for key in ("a", "b", "c"):
+            GovernmentPlan.objects.set_proposal(self.plan, key, {"title": key})
+
+        self.run_concurrently(
+            [
+                lambda: GovernmentPlan.objects.delete_proposals(self.get_plan(), ["a"]),
+                lambda: GovernmentPlan.objects.delete_proposals(self.get_plan(), ["b"]),
+                lambda: GovernmentPlan.objects.set_proposal(
+                    self.get_plan(), "d", {"title": "d"}
+                ),
+            ]
+        )
+        self.assertEqual(
+            self.get_plan().proposals, {"c": {"title": "c"}, "d": {"title": "d"}}
+        )
+
+    def test_delete_proposals_with_special_characters(self):
+        keys = ["a,b", 'c"d', "{e}", "f\\g"]
+        for key in keys + ["a", "b"]:
+            GovernmentPlan.objects.set_proposal(self.plan, key, {"title": key})
+
+        GovernmentPlan.objects.delete_proposals(self.plan, keys)
+        self.assertEqual(
+            self.plan.proposals, {"a": {"title": "a"}, "b": {"title": "b"}}
+        )
+
+        GovernmentPlan.objects.delete_proposals(self.plan, ["a", "b"])
+        self.assertIsNone(self.plan.proposals)
+
+    def test_update_from_updates_keeps_new_proposals(self):
+        stale_plan = self.get_plan()
+        GovernmentPlan.objects.set_proposal(self.plan, "a", {"title": "a"})
+        GovernmentPlanUpdate.objects.create(
+            plan=stale_plan, title="Update", status=PlanStatus.STARTED, public=True
+        )
+
+        stale_plan.update_from_updates()
+        plan = self.get_plan()
+        self.assertEqual(plan.status, PlanStatus.STARTED)
+        self.assertEqual(plan.proposals, {"a": {"title": "a"}})
+
+    def test_plan_form_excludes_proposals(self):
+        self.assertNotIn("proposals", GovernmentPlanForm().fields)
@@ -0,0 +1,79 @@
+from django.db import transaction
+from django.db.models.signals import post_init, post_save
+
+from easy_thumbnails.files import get_thumbnailer
+
+from . import conf
+from .models import GovernmentPlan, GovernmentPlanSection
+
+THUMBNAIL_MODELS = {
+    "plan": (GovernmentPlan, "GOVPLAN_PLAN_THUMBNAILS"),
+    "section": (GovernmentPlanSection, "GOVPLAN_SECTION_THUMBNAILS"),
+}
+
+
+def get_thumbnail_options(kind, image):
+    _model, setting = THUMBNAIL_MODELS[kind]
+    for options in getattr(conf, setting):
+        options = dict(options)
+        if options.get("crop"):
+            options["subject_location"] = image.subject_location
+        yield options
+
+
+def generate_thumbnails(kind, pk):
+    model, _setting = THUMBNAIL_MODELS[kind]
+    obj = model.objects.filter(pk=pk).select_related("image").first()
+    if obj is None or obj.image is None:
+        return 0
+    thumbnailer = get_thumbnailer(obj.image)
+    count = 0
+    for options in get_thumbnail_options(kind, obj.image):
+        thumbnailer.get_thumbnail(options)
+        count += 1
+    return count
+
+
+def get_thumbnail_jobs():
+    for kind, (model, _setting) in THUMBNAIL_MODELS.items():
+        for pk in model.objects.filter(image__isnull=False).values_list(
+            "pk", flat=True
+        ):
+            yield kind, pk
+
+
+def remember_image(sender, instance, **kwargs):
+    # Deferred image fields are not loaded just to remember them
+    instance._thumbnail_image_id = instance.__dict__.get("image_id")
+
+
+def schedule_thumbnails(kind, instance, created=False, update_fields=None):
+    from .tasks import generate_thumbnails_task
+
+    _model, setting = THUMBNAIL_MODELS[kind]
+    if not getattr(conf, setting):
+        return
+    if update_fields is not None and "image" not in update_fields:
+        return
+    changed = created or instance.image_id != getattr(
+        instance, "_thumbnail_image_id", None
+    )
+    instance._thumbnail_image_id = instance.image_id
+    if not changed or instance.image_id is None:
+        return
+    transaction.on_commit(lambda: generate_thumbnails_task.delay(kind, instance.pk))
+
+
+def plan_saved(sender, instance, created=False, update_fields=None, **kwargs):
+    schedule_thumbnails("plan", instance, created, update_fields)
+
+
+def section_saved(sender, instance, created=False, update_fields=None, **kwargs):
+    schedule_thumbnails("section", instance, created, update_fields)
+
+
+def connect_thumbnail_generation():
+    post_init.connect(remember_image, sender=GovernmentPlan)
+    post_init.connect(remember_image, sender=GovernmentPlanSection)
+    post_save.connect(plan_saved, sender=GovernmentPlan)
+    post_save.connect(section_saved, sender=GovernmentPlanSection)
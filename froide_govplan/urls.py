@@ -1,10 +1,17 @@
 from django.urls import path
 from django.utils.translation import pgettext_lazy
 
+from .feeds import (
+    GovernmentPlanSectionUpdatesFeed,
+    GovernmentPlanUpdatesFeed,
+    GovernmentPlanUpdatesPlanFeed,
+)
 from .views import (
     GovPlanDetailView,
+    GovPlanFragmentView,
     GovPlanProposeUpdateView,
     GovPlanSectionDetailView,
+    metrics,
     search,
 )
 
@@ -12,16 +19,39 @@ app_name = "govplan"
 
 urlpatterns = [
     path("search/", search, name="search"),
+    path("_metrics/", metrics, name="metrics"),
     path(
         pgettext_lazy("url part", "<slug:gov>/plan/<slug:plan>/"),
         GovPlanDetailView.as_view(),
         name="plan",
     ),
+    path(
+        pgettext_lazy(
+            "url part", "<slug:gov>/plan/<slug:plan>/_fragment/<slug:fragment>/"
+        ),
+        GovPlanFragmentView.as_view(),
+        name="plan_fragment",
+    ),
+    path(
+        pgettext_lazy("url part", "<slug:gov>/plan/<slug:plan>/_feed/"),
+        GovernmentPlanUpdatesPlanFeed(),
+        name="plan_feed",
+    ),
     path(
         pgettext_lazy("url part", "<slug:gov>/plan/<slug:plan>/propose-update/"),
         GovPlanProposeUpdateView.as_view(),
         name="propose_planupdate",
     ),
+    path(
+        pgettext_lazy("url part", "<slug:gov>/_feed/"),
+        GovernmentPlanUpdatesFeed(),
+        name="government_feed",
+    ),
+    path(
+        pgettext_lazy("url part", "<slug:gov>/<slug:section>/_feed/"),
+        GovernmentPlanSectionUpdatesFeed(),
+        name="section_feed",
+    ),
     path(
         pgettext_lazy("url part", "<slug:gov>/<slug:section>/"),
         GovPlanSectionDetailView.as_view(),
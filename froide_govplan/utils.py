@@ -27,3 +27,24 @@ def make_request_url(plan, publicbody):
     query.update({f: b"1" for f in hide_features})
     query = urlencode(query, quote_via=quote)
     return "%s%s?%s" % (settings.SITE_URL, url, query)
+
+
+def close_connections_before_fork():
+    """
+    Close the database connections before starting worker processes,
+    so forked workers open their own connections instead of sharing
+    the parent's server sessions.
+    """
+    from django.db import connections
+
+    connections.close_all()
+
+
+def setup_worker_process():
+    """
+    Initializer for worker processes, which open
+    their own database connections on first use.
+    """
+    import django
+
+    django.setup()
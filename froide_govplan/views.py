@@ -1,23 +1,56 @@
 from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.contrib.messages import get_messages
+from django.http import Http404, HttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.utils.cache import add_never_cache_headers
+from django.utils.crypto import constant_time_compare
+from django.utils.decorators import method_decorator
 from django.utils.translation import gettext_lazy as _
+from django.views.decorators.cache import never_cache
 from django.views.generic import DetailView, UpdateView
 from froide.helper.breadcrumbs import BreadcrumbView
 
+from . import conf
 from .auth import get_visible_plans
+from .cache import (
+    add_surrogate_keys,
+    get_cached_page,
+    get_tag_versions,
+    set_cached_page,
+)
 from .forms import GovernmentPlanUpdateProposalForm
+from .metrics import instrument, render_prometheus
 from .models import Government, GovernmentPlan, GovernmentPlanSection
+from .profiling import profile_request
+
+
+PREVIEW_PARAM = "preview"
 
 
 class GovernmentMixin(BreadcrumbView):
     def dispatch(self, *args, **kwargs):
         self.get_government()
-        return super().dispatch(*args, **kwargs)
+        response = super().dispatch(*args, **kwargs)
+        if self.show_unpublished():
+            add_never_cache_headers(response)
+        return response
+
+    def show_unpublished(self):
+        """
+        Staff see unpublished governments and plans only on preview URLs,
+        so that the normal pages are the same for all users.
+        """
+        user = self.request.user
+        return (
+            PREVIEW_PARAM in self.request.GET
+            and user.is_authenticated
+            and user.is_staff
+        )
 
     def get_government(self):
         filter_kwarg = {}
-        if not self.request.user.is_authenticated or not self.request.user.is_staff:
+        if not self.show_unpublished():
             filter_kwarg["public"] = True
         self.government = get_object_or_404(
             Government, slug=self.kwargs["gov"], **filter_kwarg
@@ -26,6 +59,7 @@ class GovernmentMixin(BreadcrumbView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context["government"] = self.government
+        context["preview"] = self.show_unpublished()
         return context
 
     def get_breadcrumbs(self, context):
@@ -41,7 +75,67 @@ class GovernmentMixin(BreadcrumbView):
         return breadcrumbs
 
 
-class GovPlanSectionDetailView(GovernmentMixin, DetailView):
+class PageCacheMixin:
+    """
+    Caches pages for anonymous users until any of their cache tags is purged.
+    """
+
+    def can_use_page_cache(self, request):
+        return (
+            conf.GOVPLAN_PAGE_CACHE
+            and request.method in ("GET", "HEAD")
+            and not request.user.is_authenticated
+            and not len(get_messages(request))
+        )
+
+    def dispatch(self, request, *args, **kwargs):
+        self.cache_tags = None
+        self.cache_tag_versions = None
+        self.use_page_cache = use_cache = self.can_use_page_cache(request)
+        if use_cache:
+            response = get_cached_page(request)
+            if response is not None:
+                return response
+
+        response = super().dispatch(request, *args, **kwargs)
+
+        if hasattr(response, "add_post_render_callback"):
+            response.add_post_render_callback(
+                lambda r: self.page_rendered(request, r, use_cache)
+            )
+        return response
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        if self.use_page_cache or conf.GOVPLAN_PAGE_CACHE_SURROGATE_KEYS:
+            self.cache_tags = self.get_cache_tags(context)
+        if self.use_page_cache:
+            self.cache_tag_versions = get_tag_versions(self.cache_tags)
+        return context
+
+    def get_cache_tags(self, context):
+        raise NotImplementedError
+
+    def page_rendered(self, request, response, use_cache):
+        if self.cache_tags is not None:
+            add_surrogate_keys(response, self.cache_tags)
+        if self.cache_tag_versions is None:
+            return
+        csrf_used = request.META.get("CSRF_COOKIE_NEEDED") or request.META.get(
+            "CSRF_COOKIE_USED"
+        )
+        if (
+            use_cache
+            and response.status_code == 200
+            and not csrf_used
+            and not response.cookies
+        ):
+            set_cached_page(request, response, self.cache_tag_versions)
+
+
+@method_decorator(profile_request("section_detail"), name="dispatch")
+@method_decorator(instrument("section_detail"), name="dispatch")
+class GovPlanSectionDetailView(PageCacheMixin, GovernmentMixin, DetailView):
     slug_url_kwarg = "section"
     template_name = "froide_govplan/section.html"
 
@@ -52,27 +146,41 @@ class GovPlanSectionDetailView(GovernmentMixin, DetailView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        queryset = get_visible_plans(self.request)
-        context["plans"] = context["object"].get_plans(queryset=queryset)
+        if self.show_unpublished():
+            queryset = get_visible_plans(self.request)
+        else:
+            queryset = GovernmentPlan.objects.filter(public=True)
+        context["plans"] = (
+            context["object"].get_plans(queryset=queryset).select_related("government")
+        )
         return context
 
+    def get_cache_tags(self, context):
+        return [
+            "government:{}".format(self.government.id),
+            "section:{}".format(self.object.id),
+            "plans:{}".format(self.government.id),
+        ]
+
     def get_breadcrumbs(self, context):
         return super().get_breadcrumbs(context) + [
             (self.object.title, self.object.get_absolute_url())
         ]
 
 
-class GovPlanDetailView(GovernmentMixin, DetailView):
+@method_decorator(profile_request("plan_detail"), name="dispatch")
+@method_decorator(instrument("plan_detail"), name="dispatch")
+class GovPlanDetailView(PageCacheMixin, GovernmentMixin, DetailView):
     slug_url_kwarg = "plan"
     template_name = "froide_govplan/detail.html"
 
     def get_queryset(self):
-        qs = GovernmentPlan.objects.filter(government=self.government)
-        if self.request.user.is_authenticated and self.request.user.is_staff:
-            return qs
-        return qs.filter(public=True).select_related(
+        qs = GovernmentPlan.objects.filter(government=self.government).select_related(
             "responsible_publicbody", "organization"
         )
+        if self.show_unpublished():
+            return qs
+        return qs.filter(public=True)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -80,12 +188,19 @@ class GovPlanDetailView(GovernmentMixin, DetailView):
             "-timestamp"
         )
         context["section"] = self.object.get_section()
-        if self.request.user.is_authenticated:
-            context["update_proposal_form"] = GovernmentPlanUpdateProposalForm()
         # For CMS toolbar
         self.request.govplan = self.object
         return context
 
+    def get_cache_tags(self, context):
+        tags = [
+            "government:{}".format(self.government.id),
+            "plan:{}".format(self.object.id),
+        ]
+        if context["section"]:
+            tags.append("section:{}".format(context["section"].id))
+        return tags
+
     def get_breadcrumbs(self, context):
         obj = context["object"]
         section = context["section"]
@@ -100,6 +215,42 @@ class GovPlanDetailView(GovernmentMixin, DetailView):
         ]
 
 
+@method_decorator(never_cache, name="dispatch")
+@method_decorator(instrument("plan_fragment"), name="dispatch")
+class GovPlanFragmentView(GovernmentMixin, DetailView):
+    """
+    Renders the personalized parts of a plan page,
+    which are loaded after the shared page.
+    """
+
+    slug_url_kwarg = "plan"
+    fragment_templates = {
+        "follow": "froide_govplan/fragments/follow.html",
+        "proposal": "froide_govplan/fragments/proposal.html",
+    }
+
+    def get_queryset(self):
+        qs = GovernmentPlan.objects.filter(government=self.government)
+        if self.show_unpublished():
+            return qs
+        return qs.filter(public=True)
+
+    def get_template_names(self):
+        try:
+            return [self.fragment_templates[self.kwargs["fragment"]]]
+        except KeyError:
+            raise Http404
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        if self.request.user.is_authenticated:
+            context["update_proposal_form"] = GovernmentPlanUpdateProposalForm()
+        return context
+
+    def get_breadcrumbs(self, context):
+        return []
+
+
 class GovPlanProposeUpdateView(GovernmentMixin, LoginRequiredMixin, UpdateView):
     slug_url_kwarg = "plan"
     form_class = GovernmentPlanUpdateProposalForm
@@ -108,6 +259,11 @@ class GovPlanProposeUpdateView(GovernmentMixin, LoginRequiredMixin, UpdateView):
         self.object = self.get_object()
         return redirect(self.object)
 
+    def show_unpublished(self):
+        # Proposals are not a shared page
+        user = self.request.user
+        return user.is_authenticated and user.is_staff
+
     def get_queryset(self):
         qs = GovernmentPlan.objects.filter(
             government=self.government, government__active=True
@@ -139,6 +295,8 @@ class GovPlanProposeUpdateView(GovernmentMixin, LoginRequiredMixin, UpdateView):
         return redirect(self.object)
 
 
+@profile_request("search")
+@instrument("search")
 def search(request):
     q = request.GET.get("q", "")
     plans = GovernmentPlan.objects.filter(public=True)
@@ -158,9 +316,26 @@ def search(request):
         except ValueError:
             pass
 
+    # The card cache key contains the government
+    plans = plans.select_related("government")
     if q:
         # limit when there's a search
         plans = plans[:20]
     return render(
         request, "froide_govplan/plugins/card_cols.html", {"object_list": plans}
     )
+
+
+@never_cache
+def metrics(request):
+    if not conf.GOVPLAN_METRICS:
+        raise Http404
+    token = conf.GOVPLAN_METRICS_TOKEN
+    authorization = request.headers.get("Authorization", "")
+    if not request.user.is_staff and not (
+        token and constant_time_compare(authorization, "Bearer {}".format(token))
+    ):
+        raise Http404
+    return HttpResponse(
+        render_prometheus(), content_type="text/plain; version=0.0.4; charset=utf-8"
+    )